@@ -4,6 +4,7 @@ import re
 from tqdm import tqdm
 from transformers import pipeline
 import subprocess
+from text_cleaning import clean_text
 
 DEVICE = 0 
 summarizer = pipeline("summarization", model="facebook/bart-large-cnn", tokenizer="facebook/bart-large-cnn", device=DEVICE)
@@ -17,55 +18,6 @@ def clean_scientific_text(text):
     text = re.sub(r'\s+', ' ', text)
     text = re.sub(r'\s+\.', '.', text)
     text = re.sub(r'\s+,', ',', text)
-    return text.strip()
-def clean_text(text):
-    """
-    Clean scientific text thoroughly.
-    """
-    # Remove LaTeX-style markers
-    text = re.sub(r'@xmath\d+', '', text)
-    text = re.sub(r'@xcite', '', text)
-    text = re.sub(r'\$.*?\$', '', text)
-    text = re.sub(r'\\(cite|ref|label)\{[^}]*\}', '', text)
-    text = re.sub(r'~', ' ', text)
-
-    # Remove (Author et al., 2019) and similar
-    text = re.sub(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)', '', text)
-
-    # Remove by Author et al.
-    text = re.sub(r'\bby\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?', '', text)
-
-    # Remove Author et al. (2019) and variations
-    text = re.sub(r'\b[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)', '', text)
-
-    # Remove (i.e., ...), (e.g., ...), etc.
-    text = re.sub(r'\((i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)', '', text, flags=re.IGNORECASE)
-
-    # Remove parenthesized dates and content (e.g., (April 2022), (2020))
-    text = re.sub(r'\(\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\(\s*\d{4}\s*\)', '', text)
-
-    # Remove figure/table mentions like (Table 3), (Fig. 2)
-    text = re.sub(r'\((Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b(Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?', '', text, flags=re.IGNORECASE)
-
-    # Remove emails and URLs
-    text = re.sub(r'\b\S+@\S+\.\S+\b', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-
-    # Remove citations like [12], [f7], [1, 2, 3]
-    text = re.sub(r'\[\s*[\w\d, ]+\]', '', text)
-
-    # Remove copyright and everything after
-    text = re.split(r'(?i)\b(copyright|©)\b', text)[0]
-
-    # Remove funding and notes sections
-    text = re.split(r'(?i)\b(funding|notes?)\b', text)[0]
-
-    # Remove empty brackets and normalize spaces
-    text = re.sub(r'\{\}|\[\]|\(\)', '', text)
-    text = re.sub(r'\s+', ' ', text)
-
     return text.strip()
 def normalize_section_name(name):
     name = re.sub(r'[^A-Za-z ]', '', name)
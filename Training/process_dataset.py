@@ -2,6 +2,7 @@ import os
 import json
 import re
 from tqdm import tqdm
+from text_cleaning import clean_text
 
 SKIP_SECTION_NAMES = [
     "references", "bibliography", "acknowledgements", "thanks", "funding", "notes",
@@ -11,21 +12,8 @@ SKIP_SECTION_NAMES = [
 MIN_PARAGRAPH_LENGTH = 50  
 
 def clean_text_v3(text):
-    text = re.sub(r'@xmath\d+|@xcite|\$.*?\$|\\(cite|ref|label)\{[^}]*\}|~', '', text)
-    text = re.sub(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)', '', text)
-    text = re.sub(r'\bby\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?', '', text)
-    text = re.sub(r'\b[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)', '', text)
-    text = re.sub(r'\((i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\(\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\(\s*\d{4}\s*\)', '', text)
-    text = re.sub(r'\((Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b(Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b\S+@\S+\.\S+\b|https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'\[\s*[\w\d, ]+\]', '', text)
-    text = re.split(r'(?i)\b(copyright|©|funding|notes?)\b', text)[0]
-    text = re.sub(r'\{\}|\[\]|\(\)', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    # Same cleaning as backend, except that '~' is dropped instead of turned into a space
+    return clean_text(text, tilde='')
 
 
 def process_dataset(input_path, output_dir, start_index=1, num_examples=5):
@@ -88,11 +88,7 @@ for epoch in range(EPOCHS):
             print(f"[DEBUG][BATCH {b_idx}] decoded input[0]: {tokenizer.decode(inputs['input_ids'][0])[:100]}")
             print(f"[DEBUG][BATCH {b_idx}] decoded label[0]: {tokenizer.decode(labels['input_ids'][0])[:100]}")
 
-        imp_masks = []
-        for idx in range(len(batch)):
-            imp_mask = build_importance_mask(inputs['input_ids'][idx:idx+1], batch_keywords[idx], tokenizer)
-            imp_masks.append(imp_mask)
-        importance_mask = torch.cat(imp_masks, dim=0)
+        importance_mask = build_importance_mask(inputs['input_ids'], batch_keywords, tokenizer)
         if DEBUG and b_idx < 2:
             print(f"[DEBUG][BATCH {b_idx}] importance_mask[0][:30]: {importance_mask[0][:30]}")
 
@@ -140,11 +136,7 @@ for epoch in range(EPOCHS):
             batch_keywords = [ex['keywords'] for ex in batch]
             inputs = tokenizer(batch_inputs, return_tensors="pt", padding=True, truncation=True, max_length=MAX_INPUT)
             labels = tokenizer(batch_labels, return_tensors="pt", padding=True, truncation=True, max_length=MAX_OUTPUT)
-            imp_masks = []
-            for idx in range(len(batch)):
-                imp_mask = build_importance_mask(inputs['input_ids'][idx:idx+1], batch_keywords[idx], tokenizer)
-                imp_masks.append(imp_mask)
-            importance_mask = torch.cat(imp_masks, dim=0)
+            importance_mask = build_importance_mask(inputs['input_ids'], batch_keywords, tokenizer)
             if DEBUG and b_idx < 2:
                 print(f"[DEBUG][VAL {b_idx}] batch_inputs[0]: {batch_inputs[0][:100]}")
                 print(f"[DEBUG][VAL {b_idx}] batch_labels[0]: {batch_labels[0][:100]}")
@@ -1,62 +1,14 @@
 import re
+import functools
 from keybert import KeyBERT
 from transformers import T5Tokenizer
 import torch
+from text_cleaning import clean_text
 
 # === INITIALIZE ONCE ===
 kw_model = KeyBERT()
 tokenizer = T5Tokenizer.from_pretrained("Falconsai/text_summarization")
 
-def clean_text(text):
-    """
-    Clean scientific text thoroughly.
-    """
-    # Remove LaTeX-style markers
-    text = re.sub(r'@xmath\d+', '', text)
-    text = re.sub(r'@xcite', '', text)
-    text = re.sub(r'\$.*?\$', '', text)
-    text = re.sub(r'\\(cite|ref|label)\{[^}]*\}', '', text)
-    text = re.sub(r'~', ' ', text)
-
-    # Remove (Author et al., 2019) and similar
-    text = re.sub(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)', '', text)
-
-    # Remove by Author et al.
-    text = re.sub(r'\bby\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?', '', text)
-
-    # Remove Author et al. (2019) and variations
-    text = re.sub(r'\b[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)', '', text)
-
-    # Remove (i.e., ...), (e.g., ...), etc.
-    text = re.sub(r'\((i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)', '', text, flags=re.IGNORECASE)
-
-    # Remove parenthesized dates and content (e.g., (April 2022), (2020))
-    text = re.sub(r'\(\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\(\s*\d{4}\s*\)', '', text)
-
-    # Remove figure/table mentions like (Table 3), (Fig. 2)
-    text = re.sub(r'\((Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b(Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?', '', text, flags=re.IGNORECASE)
-
-    # Remove emails and URLs
-    text = re.sub(r'\b\S+@\S+\.\S+\b', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-
-    # Remove citations like [12], [f7], [1, 2, 3]
-    text = re.sub(r'\[\s*[\w\d, ]+\]', '', text)
-
-    # Remove copyright and everything after
-    text = re.split(r'(?i)\b(copyright|©)\b', text)[0]
-
-    # Remove funding and notes sections
-    text = re.split(r'(?i)\b(funding|notes?)\b', text)[0]
-
-    # Remove empty brackets and normalize spaces
-    text = re.sub(r'\{\}|\[\]|\(\)', '', text)
-    text = re.sub(r'\s+', ' ', text)
-
-    return text.strip()
-
 def clean_text_v1(text):
     """
     Clean text for scientific summarization:
@@ -142,26 +94,88 @@ def split_into_chunks(text, chunk_size=512, overlap=50):
         chunks.append(tokenizer.decode(chunk))
     return chunks
 
-def build_importance_mask(input_ids, keywords, tokenizer):
+@functools.lru_cache(maxsize=8)
+def _normalized_vocab(tokenizer):
+    """
+    Map every normalized token (lowercased, without the SentencePiece '▁') to the vocab ids sharing it.
+    Built once per tokenizer.
+    """
+    table = {}
+    tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+    for token_id, tok in enumerate(tokens):
+        table.setdefault(tok.lower().replace('▁', '').strip(), []).append(token_id)
+    return table
+
+@functools.lru_cache(maxsize=4096)
+def _keyword_token_ids(tokenizer, keywords):
+    """
+    Token ids of a keyword list (tuple of strings), computed once per list.
+    Returns: (ids, spans)
+      ids: vocab ids whose normalized token is a keyword word
+      spans: token id sequences of keyword words that the tokenizer splits into several sub-words
+    """
+    words = sorted(set(word.lower() for phrase in keywords for word in phrase.split()))
+    vocab = _normalized_vocab(tokenizer)
+    ids = sorted(set(token_id for word in words for token_id in vocab.get(word, ())))
+
+    # Keywords are lowercased, the text is not: also look for the capitalized and upper-case forms
+    variants = list(dict.fromkeys(form for word in words for form in (word, word.capitalize(), word.upper())))
+    spans = set()
+    if variants:
+        for sequence in tokenizer(variants, add_special_tokens=False)["input_ids"]:
+            if len(sequence) > 1:
+                spans.add(tuple(sequence))
+    return tuple(ids), tuple(sorted(spans))
+
+def build_importance_mask(input_ids, keywords, tokenizer, value=2.6):
     """
     Build importance mask for specific input_ids (after tokenization, padding, truncation).
-    5.0 for any token matching a keyword (phrase split to words), else 0.0.
-    input_ids: torch.Tensor of shape [batch, seq]
-    keywords: list of strings
+    `value` for any token matching a keyword (phrase split to words), else 0.0.
+    A keyword word split into several sub-word tokens is marked on its whole token span.
+    Padding tokens never match, so a padded batch can be passed as is.
+    input_ids: torch.Tensor of shape [batch, seq] (the mask is built on its device)
+    keywords: list of strings shared by all rows, or one list of strings per row
     tokenizer: the tokenizer used
     Returns: torch.Tensor [batch, seq]
     """
-    flat_keywords = set(word.lower() for phrase in keywords for word in phrase.split())
-    masks = []
-    for sequence in input_ids:
-        tokens = tokenizer.convert_ids_to_tokens(sequence)
-        mask = []
-        for tok in tokens:
-            tok_clean = tok.lower().replace('▁', '').strip()
-            is_important = tok_clean in flat_keywords
-            mask.append(2.6 if is_important else 0.0)
-        masks.append(mask)
-    return torch.tensor(masks, dtype=torch.float32)
+    batch_size = input_ids.size(0)
+    device = input_ids.device
+    if keywords and not isinstance(keywords[0], str):
+        per_row = [_keyword_token_ids(tokenizer, tuple(row_keywords)) for row_keywords in keywords]
+    else:
+        per_row = [_keyword_token_ids(tokenizer, tuple(keywords))] * batch_size
+
+    # Whole-token matches
+    important = torch.zeros(input_ids.shape, dtype=torch.bool, device=device)
+    width = max(len(ids) for ids, _ in per_row) if per_row else 0
+    if width:
+        if all(row is per_row[0] for row in per_row):
+            important = torch.isin(input_ids, torch.tensor(per_row[0][0], dtype=input_ids.dtype, device=device))
+        else:
+            table = torch.full((batch_size, width), -1, dtype=input_ids.dtype)
+            for row, (ids, _) in enumerate(per_row):
+                table[row, :len(ids)] = torch.tensor(ids, dtype=input_ids.dtype)
+            important = (input_ids.unsqueeze(-1) == table.to(device).unsqueeze(1)).any(-1)
+
+    # Multi-token spans: slide each pattern over the rows whose keywords contain it
+    patterns = {}
+    for row, (_, spans) in enumerate(per_row):
+        for span in spans:
+            patterns.setdefault(span, []).append(row)
+    for span, rows in patterns.items():
+        length = len(span)
+        if length > input_ids.size(1):
+            continue
+        pattern = torch.tensor(span, dtype=input_ids.dtype, device=device)
+        starts = (input_ids.unfold(1, length, 1) == pattern).all(-1)
+        if len(rows) < batch_size:
+            row_mask = torch.zeros(batch_size, 1, dtype=torch.bool, device=device)
+            row_mask[rows] = True
+            starts &= row_mask
+        for offset in range(length):
+            important[:, offset:offset + starts.size(1)] |= starts
+
+    return important.to(torch.float32) * value
 
 
 # Optional: add prompt builder utility (for consistent prompt formatting)
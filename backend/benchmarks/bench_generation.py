@@ -0,0 +1,66 @@
+"""
+Per-token decoding latency of CustomT5.generate with and without the decoder KV cache.
+use_cache=False re-runs the decoder over the whole prefix at every step, which is what
+generation did before prepare_inputs_for_generation handled past_key_values.
+
+Usage (from backend/):
+    python benchmarks/bench_generation.py [--model-path ./MODEL/t5-custom] [--tokens 256] [--batch 4]
+
+--random benchmarks a randomly initialised t5-small sized CustomT5 instead (no checkpoint needed).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+from transformers import T5Config
+from custom_model import CustomT5
+
+
+def decode_seconds(model, input_ids, attention_mask, tokens, use_cache):
+    importance_mask = torch.zeros(input_ids.shape)
+    with torch.inference_mode():
+        encoder_outputs = model.encode(input_ids, attention_mask, importance_mask)
+        start = time.perf_counter()
+        output_ids = model.generate(
+            encoder_outputs=encoder_outputs, attention_mask=attention_mask,
+            max_length=tokens + 1, min_length=tokens + 1, do_sample=False, num_beams=1, use_cache=use_cache,
+        )
+        seconds = time.perf_counter() - start
+    return seconds, output_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default="./MODEL/t5-custom")
+    parser.add_argument("--random", action="store_true")
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--input-length", type=int, default=512)
+    args = parser.parse_args()
+
+    if args.random:
+        torch.manual_seed(0)
+        model = CustomT5(T5Config(decoder_start_token_id=0)).eval()
+    else:
+        model = CustomT5.from_pretrained(args.model_path).eval()
+    input_ids = torch.randint(2, model.config.vocab_size, (args.batch, args.input_length))
+    attention_mask = torch.ones_like(input_ids)
+
+    decode_seconds(model, input_ids, attention_mask, 4, True)  # warm-up
+    results = {}
+    for use_cache in (False, True):
+        results[use_cache] = decode_seconds(model, input_ids, attention_mask, args.tokens, use_cache)
+
+    print(f"batch {args.batch}, {args.input_length} input tokens, {args.tokens} generated tokens")
+    for use_cache, (seconds, _) in results.items():
+        label = "KV cache" if use_cache else "no cache (full prefix every step)"
+        print(f"{label:34s} {seconds / args.tokens * 1000:8.2f} ms/token  {seconds:7.2f} s")
+    print(f"speed-up x{results[False][0] / results[True][0]:.2f}, "
+          f"same output: {torch.equal(results[False][1], results[True][1])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: text_cleaning.clean_text against the former sequential re.sub implementation.
+
+Usage (from backend/):
+    python benchmarks/bench_text_cleaning.py [PAPERS_DIR] [--repeat N]
+
+PAPERS_DIR: folder of .txt papers (e.g. the *_original.txt files written by Training/process_dataset.py).
+Without it, a synthetic corpus of long papers is built from sample paragraphs.
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_cleaning import clean_text, clean_paragraphs, iter_paragraphs
+
+SAMPLE_PARAGRAPHS = [
+    "Deep networks @xcite achieve $O(n^2)$ accuracy~@xmath12 as in \\cite{lecun} and \\ref{fig:1}. "
+    "Transformers (Vaswani et al., 2017) were popularised by Devlin et al. and Brown and Mann (2020) scaled them.",
+    "Several tasks (e.g., translation) improved (April 2021), see (Table 3) and Fig. 2a for details (2019). "
+    "The protein structure is predicted from sequence data with high confidence across all benchmarks.",
+    "Contact jane.doe@uni.edu or visit https://example.org/paper?id=3 and www.lab.com [12], [1, 2, 3]. "
+    "The proposed method by Smith (2019) works {} [] () well on rainfall data from tropical regions.",
+]
+
+
+def legacy_clean_text(text):
+    """
+    utils.clean_text before text_cleaning.py: one re.sub call per pattern.
+    """
+    text = re.sub(r'@xmath\d+', '', text)
+    text = re.sub(r'@xcite', '', text)
+    text = re.sub(r'\$.*?\$', '', text)
+    text = re.sub(r'\\(cite|ref|label)\{[^}]*\}', '', text)
+    text = re.sub(r'~', ' ', text)
+    text = re.sub(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)', '', text)
+    text = re.sub(r'\bby\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?', '', text)
+    text = re.sub(r'\b[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)', '', text)
+    text = re.sub(r'\((i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\(\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*\)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\(\s*\d{4}\s*\)', '', text)
+    text = re.sub(r'\((Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b(Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b\S+@\S+\.\S+\b', '', text)
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'\[\s*[\w\d, ]+\]', '', text)
+    text = re.split(r'(?i)\b(copyright|©)\b', text)[0]
+    text = re.split(r'(?i)\b(funding|notes?)\b', text)[0]
+    text = re.sub(r'\{\}|\[\]|\(\)', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def load_corpus(papers_dir):
+    if papers_dir:
+        corpus = []
+        for path in sorted(glob.glob(os.path.join(papers_dir, "*.txt"))):
+            with open(path, encoding="utf-8") as f:
+                corpus.append(f.read())
+        return corpus
+    # ~100-page documents: 1500 paragraphs each
+    return ["\n\n".join(SAMPLE_PARAGRAPHS[i % 3] for i in range(1500 + doc)) for doc in range(5)]
+
+
+def timed(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in corpus:
+            fn(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("papers_dir", nargs="?")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.papers_dir)
+    if not corpus:
+        sys.exit(f"No .txt papers in {args.papers_dir}")
+    size_mb = sum(len(doc) for doc in corpus) / 1e6
+
+    mismatches = sum(1 for doc in corpus if clean_text(doc) != legacy_clean_text(doc))
+    print(f"{len(corpus)} documents, {size_mb:.1f}M characters, {mismatches} outputs differ from legacy")
+
+    results = {
+        "legacy (sequential re.sub)": timed(legacy_clean_text, corpus, args.repeat),
+        "clean_text": timed(clean_text, corpus, args.repeat),
+        "clean_paragraphs": timed(lambda doc: list(clean_paragraphs(iter_paragraphs(doc.splitlines(True)))), corpus, args.repeat),
+    }
+    baseline = results["legacy (sequential re.sub)"]
+    for name, seconds in results.items():
+        print(f"{name:28s} {seconds * 1000:9.1f} ms  {size_mb / seconds:6.1f} MB/s  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Accuracy-regression check for the optimized CPU inference path (cpu_inference.py).
+
+Runs the custom model on a fixed eval set twice - fp32, and int8 dynamic quantization
+(plus torch.compile with --compile) - with the same prompts, importance masks and
+generation profile as the app, and compares:
+    - encoder hidden states (masked pass): mean cosine similarity
+    - decoded summaries: exact matches and mean word-level similarity (difflib ratio)
+    - latency per passage
+
+Usage (from backend/):
+    python benchmarks/eval_cpu_optim.py [--eval-set benchmarks/eval_set.jsonl] [--min-similarity 0.9]
+
+Exits with status 1 when the mean summary similarity falls below --min-similarity.
+"""
+import argparse
+import copy
+import difflib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+import torch.nn.functional as F
+from generation_settings import DEFAULT_PROFILE, GENERATION_PROFILES, MODEL_PATH
+from cpu_inference import configure_threads, optimize_model
+from custom_model import CustomT5
+from model_registry import registry
+from utils import build_prompt_ids, build_importance_mask
+
+CPU = torch.device("cpu")
+
+
+def load_eval_set(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_model(model, tokenizer, samples, generation_kwargs):
+    """
+    Returns: (summaries, masked encoder hidden states, seconds per sample)
+    """
+    summaries, hidden_states, seconds = [], [], []
+    for sample in samples:
+        chunk_ids = tokenizer(sample["text"], add_special_tokens=False)["input_ids"]
+        ids_list, keywords_list = build_prompt_ids([chunk_ids], [sample["keywords"]], tokenizer)
+        input_ids = torch.tensor(ids_list)
+        attention_mask = torch.ones_like(input_ids)
+        importance_mask = build_importance_mask(input_ids, keywords_list, tokenizer)
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            encoder_outputs = model.encode(input_ids, attention_mask, importance_mask)
+            output_ids = model.generate(
+                encoder_outputs=encoder_outputs, attention_mask=attention_mask, **generation_kwargs
+            )
+        seconds.append(time.perf_counter() - start)
+        hidden_states.append(encoder_outputs.last_hidden_state[0])
+        summaries.append(tokenizer.decode(output_ids[0], skip_special_tokens=True))
+    return summaries, hidden_states, seconds
+
+
+def word_similarity(a, b):
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval-set", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_set.jsonl"))
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(GENERATION_PROFILES))
+    parser.add_argument("--min-similarity", type=float, default=0.9)
+    parser.add_argument("--compile", action="store_true")
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    samples = load_eval_set(args.eval_set)
+    registry.register_tokenizer("tokenizer", args.model_path)
+    tokenizer = registry.get("tokenizer")
+    baseline = CustomT5.from_pretrained(args.model_path).eval()
+    optimized = optimize_model(copy.deepcopy(baseline), CPU, quantize=True, compile=args.compile)
+
+    reference, reference_hidden, reference_seconds = run_model(baseline, tokenizer, samples, GENERATION_PROFILES[args.profile])
+    outputs, hidden, seconds = run_model(optimized, tokenizer, samples, GENERATION_PROFILES[args.profile])
+
+    cosine = sum(F.cosine_similarity(a.flatten(), b.flatten(), dim=0).item()
+                 for a, b in zip(reference_hidden, hidden)) / len(samples)
+    exact = sum(a == b for a, b in zip(reference, outputs))
+    similarity = sum(word_similarity(a, b) for a, b in zip(reference, outputs)) / len(samples)
+
+    print(f"{len(samples)} passages, {torch.get_num_threads()} threads")
+    print(f"encoder cosine similarity   {cosine:.4f}")
+    print(f"identical summaries         {exact}/{len(samples)}")
+    print(f"mean summary similarity     {similarity:.3f}")
+    print(f"fp32 latency                {sum(reference_seconds) / len(samples) * 1000:8.1f} ms/passage")
+    print(f"optimized latency           {sum(seconds) / len(samples) * 1000:8.1f} ms/passage  "
+          f"x{sum(reference_seconds) / sum(seconds):.2f}")
+
+    if similarity < args.min_similarity:
+        sys.exit(f"Regression: mean summary similarity {similarity:.3f} < {args.min_similarity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Seconds a write waits for another connection's write to the same file before failing
+SQLITE_TIMEOUT = 30
+
+
+def make_key(*parts):
+    """
+    Build a content-addressed cache key from JSON-serialisable parts
+    (texts, keyword lists, model id, generation parameters...).
+    Returns: sha256 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of JSON-serialisable values, with hit/miss counters.
+    If `path` is given, entries are also written to a SQLite table named `name`,
+    so they survive restarts; entries evicted from memory are reloaded from disk on demand.
+    Several caches can share one file: the database is in WAL mode, so reads never wait
+    for a write, and a write waits up to SQLITE_TIMEOUT seconds for another one.
+    """
+
+    def __init__(self, name, max_items=256, path=None):
+        self.name = name
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.db.commit()
+
+    def get(self, key):
+        """
+        Returns: the cached value, or None on a miss
+        """
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+
+            value = None
+            if self.db is not None:
+                row = self.db.execute(f"SELECT value FROM {self.name} WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute(
+                    f"INSERT OR REPLACE INTO {self.name} (key, value) VALUES (?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False))
+                )
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / total if total else 0.0,
+                "size": len(self.items),
+                "maxSize": self.max_items,
+                "persistent": self.db is not None,
+            }
+
+    def _remember(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
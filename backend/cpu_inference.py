@@ -0,0 +1,68 @@
+import logging
+import os
+import torch
+import torch.nn as nn
+
+# === CPU inference settings === #
+# CPU_OPTIMIZED=1: int8 dynamic quantization of every nn.Linear, and torch.inference_mode
+# TORCH_COMPILE=1: also torch.compile the model forward (the first requests are slow while it compiles)
+# TORCH_NUM_THREADS=n: intra-op threads used by torch (default: torch's own choice)
+CPU_OPTIMIZED = os.environ.get("CPU_OPTIMIZED", "0") == "1"
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "0") == "1"
+NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "0"))
+
+
+def configure_threads(num_threads=NUM_THREADS):
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    logging.info(f"[⚙️ CPU] torch uses {torch.get_num_threads()} threads")
+
+
+def quantize_linear_layers(model):
+    """
+    Dynamic int8 quantization of every nn.Linear, in place: the q/k/v/o projections of the
+    (custom) attention, the feed-forward layers and lm_head. Weights are stored as int8 and
+    activations are quantized on the fly. CPU only.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def compile_forward(model):
+    """
+    Compile the model forward used by generate() at every decoding step.
+    dynamic=True avoids recompiling for every new batch size / sequence length.
+    """
+    model.forward = torch.compile(model.forward, dynamic=True)
+    return model
+
+
+def optimize_model(model, device, quantize=CPU_OPTIMIZED, compile=TORCH_COMPILE):
+    """
+    Apply the inference optimizations selected by the flags to an eval-mode model.
+    Returns: the optimized model
+    """
+    if quantize:
+        if device.type == "cpu":
+            model = quantize_linear_layers(model)
+            logging.info(f"[⚙️ CPU] {type(model).__name__}: nn.Linear layers quantized to int8")
+        else:
+            logging.warning(f"[⚙️ CPU] int8 dynamic quantization only runs on CPU, skipped on {device}")
+    if compile:
+        model = compile_forward(model)
+        logging.info(f"[⚙️ CPU] {type(model).__name__}: forward compiled with torch.compile")
+    return model
+
+
+def model_variant(device, quantize=CPU_OPTIMIZED):
+    """
+    Name of the numeric variant optimize_model produces on `device`, e.g. "cpu-int8" or "cuda-fp32".
+    Variants decode slightly differently, so cached outputs are keyed on it.
+    """
+    return f"{device.type}-{'int8' if quantize and device.type == 'cpu' else 'fp32'}"
+
+
+def inference_context():
+    """
+    torch.inference_mode() in CPU-optimized mode, torch.no_grad() otherwise.
+    """
+    return torch.inference_mode() if CPU_OPTIMIZED else torch.no_grad()
@@ -1,11 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import os
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import torch
 from transformers import T5ForConditionalGeneration
-from transformers import T5Tokenizer
 from custom_model import CustomT5
-from bert_score import score
+from jobs import JobManager
+from cache import ResultCache, make_key
+from model_registry import registry
+from cpu_inference import configure_threads, optimize_model, model_variant, inference_context
+from pipeline import Producer, StageTimer
+from lexicon import load_lexicon
+from generation_settings import MODEL_PATH, GENERATION_PROFILES, DEFAULT_PROFILE, BASELINE_GENERATION_KWARGS
 import logging
 logging.basicConfig(level=logging.INFO)
 
@@ -15,17 +23,24 @@ from metrics_new import (
     calculate_complexity,
     calculate_readability,
     calculate_word_freq_score,
-    calculate_embedding_similarity
+    calculate_embedding_similarity,
+    calculate_bert_score,
+    embedding_cache
 )
 
 from utils import (
     clean_text as preprocess_text,
     split_sections,
-    extract_keywords,
-    split_into_chunks,
+    split_tei_sections,
+    build_keyword_indexes,
+    embed_texts,
+    chunk_token_ids,
+    prompt_chunk_budget,
+    build_prompt_ids,
     build_importance_mask,
     build_prompt as prepare_prompt,
-    postprocess_summary
+    postprocess_summary,
+    bucket_by_length
 
 )
 
@@ -33,174 +48,710 @@ from utils import (
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# === Load Resources === #
+# === Register Resources === #
+# Models and word lists are loaded on first use (or by the warm-up thread below),
+# so the server binds its port without waiting for them.
 common_words_file = "google-10000-english.txt"
 freq_file = "words_219k.txt"
-common_words = [line.strip() for line in open(common_words_file, encoding="utf-8")]
-frequency_data = load_frequency_data(freq_file)
+# Both are opened from their prebuilt .lex files (see lexicon.py) when these exist
+registry.register("common_words", lambda: load_lexicon(common_words_file, load_common_words))
+registry.register("frequency_data", lambda: load_lexicon(freq_file, load_frequency_data))
 
-# === Load Model === #
+# === Register Model === #
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"[⚙️ Device] Using device: {device}")
+configure_threads()
 
-MODEL_PATH = "./MODEL/t5-custom"  
-tokenizer = T5Tokenizer.from_pretrained(MODEL_PATH)
-model = CustomT5.from_pretrained(MODEL_PATH).to(device).eval()
+registry.register_tokenizer("tokenizer", MODEL_PATH)
+registry.register("model", lambda: optimize_model(CustomT5.from_pretrained(MODEL_PATH).to(device).eval(), device))
+
+# === Register baseline model === #
+registry.register_tokenizer("default_tokenizer", "t5-small")
+registry.register(
+    "default_model",
+    lambda: optimize_model(T5ForConditionalGeneration.from_pretrained("t5-small").to(device).eval(), device)
+)
+
+# === Generation settings === #
+# Number of chunks decoded together in one generate() call.
+BATCH_SIZE = int(os.environ.get("SIMPLIFY_BATCH_SIZE", "8"))
+# "fast" runs only the masked pass (unmasked pass as a fallback for empty outputs),
+# "diagnostic" runs both passes on every chunk and returns the debug trace.
+MODES = ("fast", "diagnostic")
+# Decoding profiles (GENERATION_PROFILES) and baseline sampling settings: see generation_settings.py
+
+# === Result caches === #
+# Whole /simplify responses and single chunk outputs, keyed on content + model (and its
+# quantized or fp32 variant) + generation settings.
+MODEL_VARIANT = model_variant(device)
+# Set CACHE_PATH to a SQLite file to keep entries across restarts.
+CACHE_PATH = os.environ.get("CACHE_PATH")
+response_cache = ResultCache("responses", max_items=int(os.environ.get("CACHE_SIZE", "128")), path=CACHE_PATH)
+chunk_cache = ResultCache("chunks", max_items=int(os.environ.get("CHUNK_CACHE_SIZE", "4096")), path=CACHE_PATH)
+# Baseline outputs, generated in the background and fetched through /baseline/<id>, and their failures
+BASELINE_CACHE_SIZE = int(os.environ.get("BASELINE_CACHE_SIZE", "128"))
+baseline_cache = ResultCache("baselines", max_items=BASELINE_CACHE_SIZE, path=CACHE_PATH)
+baseline_errors = ResultCache("baseline_errors", max_items=BASELINE_CACHE_SIZE)
+# Threads generating baselines, and only baselines: a whole article's baseline can take as long as
+# the request that started it, and must never hold up the preparation of other requests.
+# BASELINE_WORKERS baselines run at the same time, the others wait in the executor's queue.
+baseline_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BASELINE_WORKERS", "1")), thread_name_prefix="baseline"
+)
+
+# === Pipeline === #
+# Threads preparing sections (keywords, chunks, prompt ids) ahead of the model; nothing else runs
+# on them (baselines have baseline_pool). Each request being simplified, /simplify call or /jobs
+# job, holds one worker while its sections are prepared, so PIPELINE_WORKERS should cover the
+# requests simplified at the same time (JOB_WORKERS plus concurrent /simplify calls): a request
+# beyond that waits for a free worker before its preparation starts.
+# Sections are prepared in groups of about one micro-batch of text (a chunk is roughly
+# CHUNK_CHARS characters), and a request's preparation runs at most PIPELINE_QUEUE_SIZE groups ahead.
+pipeline_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PIPELINE_WORKERS", "4")), thread_name_prefix="pipeline"
+)
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "2"))
+CHUNK_CHARS = 1800
+
+# === Background jobs === #
+job_manager = JobManager(
+    max_workers=int(os.environ.get("JOB_WORKERS", "2")),
+    max_pending=int(os.environ.get("JOB_QUEUE_LIMIT", "16")),
+)
+
+# === Metrics === #
+# Each metric scores the simplified output, "bert" (BERTScore) and "berts" (SBERT similarity)
+# compare it to the baseline. Only the cheap ones are computed by default, the others on
+# request or afterwards through /metrics.
+METRICS = {
+    "readability": lambda output, baseline: calculate_readability(output, registry.get("common_words")),
+    "complexity": lambda output, baseline: calculate_complexity(output),
+    "frequencyScore": lambda output, baseline: calculate_word_freq_score(output, registry.get("frequency_data")) * 100,
+    "bert": lambda output, baseline: calculate_bert_score(output, baseline),
+    "berts": lambda output, baseline: calculate_embedding_similarity(output, baseline),
+}
+DEFAULT_METRICS = ["readability", "complexity", "frequencyScore"]
+BASELINE_METRICS = ("bert", "berts")
+
+
+def validate_metrics(names):
+    """
+    Returns: an error message, or None if `names` is a list of known metrics
+    """
+    if not isinstance(names, list) or any(name not in METRICS for name in names):
+        return f"Invalid 'metrics', expected a list of: {', '.join(METRICS)}"
+    return None
+
+
+def compute_metrics(output, baseline, names):
+    return {name: METRICS[name](output, baseline) for name in names}
 
-# === Load baseline model === #
-default_tokenizer = T5Tokenizer.from_pretrained("t5-small")
-default_model = T5ForConditionalGeneration.from_pretrained("t5-small").to(device).eval()
 
 # === Simplification with custom model === #
-def simplify_text(text):
-    raw_text = text
+def collect_chunks(sections, keyword_indexes):
+    """
+    Split every section into chunks and prepare the prompt and keywords of each chunk.
+    keyword_indexes: {section_name: KeywordIndex}, so chunk keywords reuse the section candidate embeddings;
+    the chunks of all sections are embedded together in one batch.
+    Chunks are cut on the model tokenizer's ids, leaving room for the prompt around them,
+    and the prompt ids are assembled from those ids without re-tokenizing the chunk.
+    Returns: list of chunk records (dicts), in section and chunk order.
+    """
+    tokenizer = registry.get("tokenizer")
+    budget = prompt_chunk_budget(tokenizer)
+    chunk_spans = {name: chunk_token_ids(text, tokenizer, budget) for name, text in sections.items()}
+    chunks_by_section = {name: [chunk_text for chunk_text, _ in spans] for name, spans in chunk_spans.items()}
+    all_chunks = [chunk for chunks in chunks_by_section.values() for chunk in chunks]
+    chunk_embeddings = embed_texts(all_chunks) if all_chunks else None
+
+    records = []
+    offset = 0
+    for section_name, chunks in chunks_by_section.items():
+        section_embeddings = chunk_embeddings[offset:offset + len(chunks)] if chunks else None
+        offset += len(chunks)
+        chunk_keywords = keyword_indexes[section_name].keywords(chunks, section_embeddings) if chunks else []
+        for i, (chunk, keywords) in enumerate(zip(chunks, chunk_keywords)):
+            records.append({
+                "section": section_name,
+                "index": i,
+                "total": len(chunks),
+                "keywords": keywords,
+                "chunk": chunk,
+                "chunk_ids": chunk_spans[section_name][i][1],
+            })
+
+    # Unpadded prompt ids; each micro-batch is padded to its own longest row later.
+    if records:
+        ids_list, keywords_list = build_prompt_ids(
+            [record["chunk_ids"] for record in records], [record["keywords"] for record in records], tokenizer
+        )
+        for record, ids, keywords in zip(records, ids_list, keywords_list):
+            record["ids"] = ids
+            record["keywords"] = keywords
+            record["prompt"] = prepare_prompt(record.pop("chunk"), keywords)
+    return records
+
+
+def run_generate(encoder_outputs, attention_mask, profile=DEFAULT_PROFILE):
+    """
+    Decode a batch with the custom model from precomputed encoder outputs.
+    Returns: list of output strings, one per row.
+    """
+    model, tokenizer = registry.get("model"), registry.get("tokenizer")
+    output_ids = model.generate(
+        encoder_outputs=encoder_outputs,
+        attention_mask=attention_mask,
+        **GENERATION_PROFILES[profile]
+    )
+    return tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+
+
+def generate_batch(records, mode="fast", profile=DEFAULT_PROFILE):
+    """
+    Run the custom model on a micro-batch of chunk records.
+    The masked pass always runs. The unmasked pass runs for every row in
+    "diagnostic" mode, and in "fast" mode only for rows whose masked output is empty.
+    Each chunk is encoded once per pass and the encoder outputs are fed to generate().
+    Each record is filled with its input ids, mask and decoded outputs.
+    """
+    model, tokenizer = registry.get("model"), registry.get("tokenizer")
+    inputs = tokenizer.pad({"input_ids": [record["ids"] for record in records]}, return_tensors="pt")
+    input_ids = inputs["input_ids"].to(device)
+    attention_mask = inputs["attention_mask"].to(device)
+    # One mask for the whole padded batch, built on device; padding positions stay 0.
+    importance_mask = build_importance_mask(input_ids, [record["keywords"] for record in records], tokenizer)
+
+    with inference_context():
+        if mode == "diagnostic":
+            encoder_outputs, encoder_outputs_masked = model.encode_pair(input_ids, attention_mask, importance_mask)
+        else:
+            encoder_outputs = None
+            encoder_outputs_masked = model.encode(input_ids, attention_mask, importance_mask)
+        outputs_masked = run_generate(encoder_outputs_masked, attention_mask, profile)
+
+        for j, record in enumerate(records):
+            record["input_ids"] = record["ids"][:20]
+            record["importance_mask"] = importance_mask[j][:20].tolist()
+            record["output_masked"] = outputs_masked[j]
+            record["output"] = None
+
+        if mode == "diagnostic":
+            rows = list(range(len(records)))
+        else:
+            rows = [j for j, text in enumerate(outputs_masked) if not text.strip()]
+            if rows:
+                encoder_outputs = model.encode(input_ids[rows], attention_mask[rows])
+        if not rows:
+            return
+
+        outputs = run_generate(encoder_outputs, attention_mask[rows], profile)
+    for j, output_text in zip(rows, outputs):
+        records[j]["output"] = output_text
+
+
+def format_section(section_name, records, mode="fast"):
+    """
+    Build the output lines (and, in "diagnostic" mode, the debug lines) of one section
+    from its generated chunk records.
+    Returns: (output_lines, debug_lines)
+    """
+    logging.info(f"\n[📌 SECTION: {section_name}]")
+    output_lines = [f"[SECTION: {section_name}]\n"]
+    debug_lines = [f"\n================ SECTION: {section_name} ================\n"]
+
+    for record in records:
+        i, total = record["index"], record["total"]
+        output_text = record["output"] or ""
+        output_text_masked = record["output_masked"]
+
+        if mode == "diagnostic":
+            debug_lines.append(f"\n--- Chunk {i + 1}/{total} ---\n")
+            debug_lines.append("[🔤 Prompt]:\n" + record["prompt"] + "\n")
+            debug_lines.append("[🔑 Keywords]: " + ", ".join(record["keywords"]) + "\n")
+            debug_lines.append("[📟 input_ids (first 20)]:\n" + str(record["input_ids"]) + "\n")
+            debug_lines.append("[🟩 Importance mask (first 20)]:\n" + str(record["importance_mask"]) + "\n")
+            debug_lines.append("[🟡 Output (no importance_mask)]:\n" + output_text + "\n")
+            debug_lines.append("[🟢 Output (with importance_mask)]:\n" + output_text_masked + "\n")
+
+        if output_text_masked.strip():
+            output_lines.append(output_text_masked.strip() + "\n\n")
+            logging.info(f"[🟢 Chunk {i + 1}/{total}] Output (with importance_mask)")
+        elif output_text.strip():
+            output_lines.append(output_text.strip() + "\n")
+            logging.info(f"[🟡 Chunk {i + 1}/{total}] Output (no importance_mask)")
+
+    return output_lines, debug_lines
+
+
+def prepare_sections(text, tei_sections=None):
+    """
+    Split the article into sections and clean each of them.
+    tei_sections: optional split_tei_sections() output for the GROBID TEI of the same article
+    (from /extract-pdf); its <div>/<head> structure is used instead of detecting headers in the text.
+    Returns: dict {section_title: cleaned_text}
+    """
+    sections_raw = tei_sections if tei_sections is not None else split_sections(text)
+    return {name: preprocess_text(text) for name, text in sections_raw.items()}
+
+
+def section_groups(sections, min_chars):
+    """
+    Split the section names into consecutive groups of at least `min_chars` characters
+    of text (the last group may be smaller).
+    Returns: list of tuples of section names
+    """
+    groups = []
+    group, size = [], 0
+    for name, text in sections.items():
+        group.append(name)
+        size += len(text)
+        if size >= min_chars:
+            groups.append(tuple(group))
+            group, size = [], 0
+    if group:
+        groups.append(tuple(group))
+    return groups
+
+
+def chunk_cache_key(record, profile=DEFAULT_PROFILE):
+    return make_key(
+        "chunk", MODEL_PATH, MODEL_VARIANT, GENERATION_PROFILES[profile], record["prompt"], record["keywords"]
+    )
+
+
+def simplify_text(text, batch_size=BATCH_SIZE, mode="fast", on_section=None, sections=None,
+                  profile=DEFAULT_PROFILE, timer=None, chunks=None):
+    """
+    Simplify an article section by section with the custom model.
+    on_section: optional callback(section_name, simplified_text), called as soon as
+    all chunks of a section are generated (sections may finish out of order).
+    sections: optional output of prepare_sections(text), to avoid splitting and cleaning twice.
+    profile: name of the GENERATION_PROFILES entry used for decoding.
+    timer: optional StageTimer collecting the seconds spent per stage.
+    chunks: optional list, filled with the chunk records of all sections in section order.
+    Groups of sections are prepared (keywords, chunks, prompt ids) on a pool thread while the
+    model generates the chunks of the groups prepared before them, in full micro-batches.
+    """
     trace = {}
-    sections_raw = split_sections(raw_text)
+    timer = timer or StageTimer()
+    if sections is None:
+        with timer.stage("cleaning"):
+            sections = prepare_sections(text)
     trace["sections"] = (
-        f"The text was identified as containing {len(sections_raw)} sections."
-        if len(sections_raw) > 1
+        f"The text was identified as containing {len(sections)} sections."
+        if len(sections) > 1
         else "The text was not split into sections."
     )
-
-    sections = {name: preprocess_text(text) for name, text in sections_raw.items()}
     trace["cleaned"] = "Text cleaning was applied to the text."
-
+    trace["profile"] = f"The '{profile}' generation profile was used: {GENERATION_PROFILES[profile]}."
+
+    def prepare_group(section_names):
+        # Candidate keyphrases of the whole group are embedded together and reused for its chunks
+        group = {name: sections[name] for name in section_names}
+        with timer.stage("keywords"):
+            indexes, keywords = build_keyword_indexes(list(group.values()))
+        with timer.stage("chunking"):
+            records = collect_chunks(group, dict(zip(section_names, indexes)))
+        return [
+            (name, section_keywords, [record for record in records if record["section"] == name])
+            for name, section_keywords in zip(section_names, keywords)
+        ]
 
     keywords_dict = {}
-    for section_name, section_text in sections.items():
-        keywords = extract_keywords(section_text)
-        keywords_dict[section_name] = keywords
+    chunks_by_section = {}
+    remaining = {}
+    formatted = {}
+    total_chunks = 0
+    cached_chunks = 0
+
+    def finish_section(section_name):
+        formatted[section_name] = format_section(section_name, chunks_by_section[section_name], mode)
+        if on_section is not None:
+            on_section(section_name, " ".join(formatted[section_name][0][1:]).strip())
+
+    producer = Producer(
+        pipeline_pool, prepare_group, section_groups(sections, batch_size * CHUNK_CHARS),
+        maxsize=PIPELINE_QUEUE_SIZE
+    )
+    pending = []
+    try:
+        while not producer.done:
+            with timer.stage("waiting"):
+                ready = producer.next_ready()
+
+            # Chunks already generated for an identical prompt are taken from the chunk cache.
+            # "diagnostic" mode always regenerates, since it needs both passes for every chunk.
+            prepared = [section for _, group in ready for section in group]
+            for section_name, keywords, records in prepared:
+                keywords_dict[section_name] = keywords
+                chunks_by_section[section_name] = records
+                if chunks is not None:
+                    chunks.extend(records)
+                remaining[section_name] = len(records)
+                total_chunks += len(records)
+                for record in records:
+                    cached = chunk_cache.get(chunk_cache_key(record, profile)) if mode == "fast" else None
+                    if cached is not None:
+                        record.update(cached)
+                        remaining[section_name] -= 1
+                        cached_chunks += 1
+                    else:
+                        pending.append(record)
+                if remaining[section_name] == 0:
+                    finish_section(section_name)
+
+            # Pending chunks of all the sections ready so far are generated together in micro-batches,
+            # then mapped back to their section and chunk order. Until every section is prepared,
+            # only full micro-batches run and the rest waits for the chunks of the next sections.
+            batches = bucket_by_length([len(record["ids"]) for record in pending], batch_size)
+            if not producer.done:
+                batches = [batch_rows for batch_rows in batches if len(batch_rows) == batch_size]
+            generated = set()
+            for batch_rows in batches:
+                generated.update(batch_rows)
+                batch = [pending[j] for j in batch_rows]
+                logging.info(f"[🧮 Batch] Generating {len(batch)} chunks of up to {len(batch[-1]['ids'])} tokens")
+                with timer.stage("generation"):
+                    generate_batch(batch, mode, profile)
+                for record in batch:
+                    chunk_cache.set(chunk_cache_key(record, profile), {
+                        "output_masked": record["output_masked"],
+                        "output": record["output"],
+                    })
+                    remaining[record["section"]] -= 1
+                    if remaining[record["section"]] == 0:
+                        finish_section(record["section"])
+            pending = [record for j, record in enumerate(pending) if j not in generated]
+    finally:
+        producer.close()
+
     trace["keywords"] = keywords_dict
+    trace["chunks"] = f"The text was split into {total_chunks} chunks."
+    trace["cache"] = f"{cached_chunks} of {total_chunks} chunks were taken from the cache."
 
     full_output = []
     debug_lines = []
-    chunks_counter = 0
-    for section_name, section_text in sections.items():
-        print(f"\n[📌 SECTION: {section_name}]")
-        logging.info(f"\n[📌 SECTION: {section_name}]")
-
-        full_output.append(f"[SECTION: {section_name}]\n")
-        debug_lines.append(f"\n================ SECTION: {section_name} ================\n")
-
-        chunks = split_into_chunks(section_text)
-        chunks_counter = chunks_counter+len(chunks)
-        for i, chunk in enumerate(chunks):
-            print(f"\n--- [🔹 Chunk {i + 1}/{len(chunks)}] ---")
-            logging.info(f"\n--- [🔹 Chunk {i + 1}/{len(chunks)}] ---")
-
-            keywords = extract_keywords(chunk)
-            prompt = prepare_prompt(chunk, keywords)
-
-            inputs = tokenizer(
-                prompt,
-                return_tensors="pt",
-                padding="max_length",
-                truncation=True,
-                max_length=512
-            )
-            inputs = {k: v.to(device) for k, v in inputs.items()}
-            importance_mask = build_importance_mask(inputs["input_ids"], keywords, tokenizer).to(device)
-            debug_lines.append(f"\n--- Chunk {i + 1}/{len(chunks)} ---\n")
-            debug_lines.append("[🔤 Prompt]:\n" + prompt + "\n")
-            debug_lines.append("[🔑 Keywords]: " + ", ".join(keywords) + "\n")
-            debug_lines.append("[📟 input_ids (first 20)]:\n" + str(inputs["input_ids"][0][:20].tolist()) + "\n")
-            debug_lines.append("[🟩 Importance mask (first 20)]:\n" + str(importance_mask[0][:20].tolist()) + "\n")
-
-            with torch.no_grad():
-                output_ids = model.generate(
-                    input_ids=inputs["input_ids"],
-                    attention_mask=inputs["attention_mask"],
-                    max_length=256,
-                    min_length=5,
-                )
-                output_text = tokenizer.decode(output_ids[0], skip_special_tokens=True)
-                print("[🟡 Output (no importance_mask)]:", output_text)
-                debug_lines.append("[🟡 Output (no importance_mask)]:\n" + output_text + "\n")
-
-                output_ids_masked = model.generate(
-                    input_ids=inputs["input_ids"],
-                    attention_mask=inputs["attention_mask"],
-                    importance_mask=importance_mask,
-                    max_length=256,
-                    min_length=5,
-                )
-                output_text_masked = tokenizer.decode(output_ids_masked[0], skip_special_tokens=True)
-                print("[🟢 Output (with importance_mask)]:", output_text_masked)
-
-                debug_lines.append("[🟢 Output (with importance_mask)]:\n" + output_text_masked + "\n")
-
-                if output_text_masked.strip():
-                    full_output.append(output_text_masked.strip() + "\n\n")
-                    logging.info("[🟢 Output (with importance_mask)]")
-                elif output_text.strip():
-                    full_output.append(output_text.strip() + "\n")
-                    logging.info("[🟡 Output (no importance_mask)]")
-
-
-        trace["chunks"] = f"The text was split into {chunks_counter} chunks."
+    for section_name in sections:
+        output_lines, section_debug_lines = formatted[section_name]
+        full_output.extend(output_lines)
+        debug_lines.extend(section_debug_lines)
+
+    if mode == "diagnostic":
+        trace["debug"] = "".join(debug_lines)
+    trace["timings"] = timer.as_dict()
 
     return " ".join(full_output), keywords_dict, trace , "\n".join(full_output)
 
 
 # === Simplification with baseline === #
-def simplify_with_base_model(text):
-    text_clean = preprocess_text(text)
-    chunks = split_into_chunks(text_clean)
-    summaries = []
+# The baseline is only a comparison for the custom model output (and the reference of the
+# "bert"/"berts" metrics), so it runs in the background and is fetched through /baseline/<id>.
+baseline_jobs = {}
+baseline_lock = threading.Lock()
+
+
+def baseline_cache_key(sections, profile=DEFAULT_PROFILE):
+    # The baseline is generated from the custom model's chunks, cut with its prompt budget
+    budget = prompt_chunk_budget(registry.get("tokenizer"))
+    return make_key(
+        "baseline", "t5-small", MODEL_VARIANT, GENERATION_PROFILES[profile]["max_length"],
+        BASELINE_GENERATION_KWARGS, MODEL_PATH, budget, list(sections.items())
+    )
+
 
-    for chunk in chunks:
-        inputs = default_tokenizer(chunk, return_tensors="pt", truncation=True, padding="max_length", max_length=512)
+def baseline_chunk_ids(sections, records=None):
+    """
+    Input ids of the baseline chunks (without EOS): the chunks of the custom model, taken from the
+    records simplify_text produced, or cut from the cleaned sections the same way (collect_chunks)
+    when the baseline starts before it. They are re-encoded with the baseline tokenizer unless
+    both models share a tokenizer.
+    """
+    tokenizer, default_tokenizer = registry.get("tokenizer"), registry.get("default_tokenizer")
+    if records is None:
+        budget = prompt_chunk_budget(tokenizer)
+        chunk_ids = [ids for text in sections.values() for _, ids in chunk_token_ids(text, tokenizer, budget)]
+    else:
+        chunk_ids = [record["chunk_ids"] for record in records]
+    if tokenizer is default_tokenizer or not chunk_ids:
+        return chunk_ids
+    chunk_texts = tokenizer.batch_decode(chunk_ids, skip_special_tokens=True)
+    return [ids[:511] for ids in default_tokenizer(chunk_texts, add_special_tokens=False)["input_ids"]]
+
+
+def simplify_with_base_model(chunk_ids, batch_size=BATCH_SIZE, profile=DEFAULT_PROFILE):
+    """
+    Summarize already cleaned and chunked text with the baseline model.
+    chunk_ids: list of chunk input ids (see baseline_chunk_ids)
+    """
+    default_model, default_tokenizer = registry.get("default_model"), registry.get("default_tokenizer")
+    # Chunk ids are fed as they are (plus EOS), without decoding and re-encoding them
+    encoded = [ids + [default_tokenizer.eos_token_id] for ids in chunk_ids]
+    summaries = [None] * len(encoded)
+
+    for batch_rows in bucket_by_length([len(ids) for ids in encoded], batch_size):
+        inputs = default_tokenizer.pad({"input_ids": [encoded[j] for j in batch_rows]}, return_tensors="pt")
         inputs = {k: v.to(device) for k, v in inputs.items()}
-        with torch.no_grad():
+        with inference_context():
             output = default_model.generate(
                 input_ids=inputs["input_ids"],
-                max_length=256,
-                do_sample=True,
-                top_k=50,
-                top_p=0.9,
-                temperature=0.8,
-                repetition_penalty=2.0,
-                no_repeat_ngram_size=3,
-                num_return_sequences=1
+                attention_mask=inputs["attention_mask"],
+                max_length=GENERATION_PROFILES[profile]["max_length"],
+                **BASELINE_GENERATION_KWARGS
             )
-            summary = default_tokenizer.decode(output[0], skip_special_tokens=True)
-            summaries.append(summary)
+        for j, summary in zip(batch_rows, default_tokenizer.batch_decode(output, skip_special_tokens=True)):
+            summaries[j] = summary
 
     full_summary = " ".join(summaries)
     return postprocess_summary(full_summary)
 
 
+def run_baseline(key, sections, records, profile):
+    try:
+        baseline = simplify_with_base_model(baseline_chunk_ids(sections, records), profile=profile)
+        baseline_cache.set(key, baseline)
+        return baseline
+    except Exception as e:
+        logging.exception("[❌ Baseline] Generation failed")
+        with baseline_lock:
+            baseline_errors.set(key, str(e))
+        raise
+    finally:
+        with baseline_lock:
+            baseline_jobs.pop(key, None)
+
+
+def start_baseline(key, sections, records=None, profile=DEFAULT_PROFILE):
+    """
+    Generate the baseline of `sections` in the background, unless it is cached or already running.
+    Returns: the Future of the running generation, or None if the baseline is cached
+    """
+    with baseline_lock:
+        if key in baseline_jobs:
+            return baseline_jobs[key]
+        if baseline_cache.get(key) is not None:
+            return None
+        future = baseline_pool.submit(run_baseline, key, sections, records, profile)
+        baseline_jobs[key] = future
+        return future
+
+
+# === Request handling === #
+def validate_simplify_request(data):
+    """
+    Check the body of a /simplify or /jobs request. Its TEI, if any, is parsed here, once.
+    Returns: (error, tei_sections) - an error message, or None if the request is valid,
+    and the split_tei_sections() output of its "tei" (None without one)
+    """
+    if not data or "text" not in data:
+        return "Missing 'text' in request", None
+    mode = data.get("mode", "fast")
+    if mode not in MODES:
+        return f"Invalid 'mode', expected one of: {', '.join(MODES)}", None
+    if data.get("profile", DEFAULT_PROFILE) not in GENERATION_PROFILES:
+        return f"Invalid 'profile', expected one of: {', '.join(GENERATION_PROFILES)}", None
+    if not isinstance(data.get("baseline", True), bool):
+        return "'baseline' must be true or false", None
+    error = validate_metrics(data.get("metrics", DEFAULT_METRICS))
+    if error:
+        return error, None
+    if data.get("baseline") is False and any(name in BASELINE_METRICS for name in data.get("metrics", [])):
+        return f"Metrics {', '.join(BASELINE_METRICS)} need the baseline, which was disabled", None
+    tei = data.get("tei")
+    if tei is None:
+        return None, None
+    if not isinstance(tei, str):
+        return "'tei' must be the TEI XML returned by /extract-pdf", None
+    try:
+        return None, split_tei_sections(tei)
+    except ValueError as e:
+        return str(e), None
+
+
+def run_simplify(data, on_section=None, tei_sections=None):
+    """
+    Run the full simplification pipeline on a validated request body.
+    tei_sections: the sections validate_simplify_request parsed from its "tei".
+    The baseline (unless "baseline" is false) is generated in the background from the same chunks:
+    the payload carries it if it is already available, and its id for /baseline/<id> otherwise.
+    Returns: the response payload (dict)
+    """
+    original_text = data["text"]
+    mode = data.get("mode", "fast")
+    profile = data.get("profile", DEFAULT_PROFILE)
+    metric_names = data.get("metrics", DEFAULT_METRICS)
+    with_baseline = data.get("baseline", True)
+    timer = StageTimer()
+    with timer.stage("cleaning"):
+        if tei_sections is None and data.get("tei"):
+            tei_sections = split_tei_sections(data["tei"])
+        sections = prepare_sections(original_text, tei_sections)
+    baseline_key = baseline_cache_key(sections, profile)
+    cache_key = make_key(
+        "response", MODEL_PATH, MODEL_VARIANT, profile, GENERATION_PROFILES[profile], BASELINE_GENERATION_KWARGS,
+        mode, sorted(metric_names), list(sections.items())
+    )
+    cached = response_cache.get(cache_key)
+    records = None
+    if cached is not None:
+        logging.info("[💾 Cache] /simplify response served from cache")
+        if on_section is not None:
+            for section_name, text in cached["sections"]:
+                on_section(section_name, text)
+        payload = cached["payload"]
+    else:
+        section_outputs = []
+        def collect_section(section_name, text):
+            section_outputs.append((section_name, text))
+            if on_section is not None:
+                on_section(section_name, text)
+
+        # The comparison metrics need the baseline: it is generated next to the custom model
+        future = None
+        needs_baseline = any(name in BASELINE_METRICS for name in metric_names)
+        if needs_baseline:
+            future = start_baseline(baseline_key, sections, profile=profile)
+
+        records = []
+        simplified, keywords, trace , full_out  = simplify_text(
+            original_text, mode=mode, on_section=collect_section, sections=sections, profile=profile,
+            timer=timer, chunks=records
+        )
+
+        # Only the comparison metrics wait for the baseline
+        baseline = None
+        if needs_baseline:
+            with timer.stage("baseline"):
+                baseline = future.result() if future is not None else baseline_cache.get(baseline_key)
+        with timer.stage("metrics"):
+            metrics = compute_metrics(full_out, baseline, metric_names)
+        trace["timings"] = timer.as_dict()
+
+        payload = {
+            "simplified": simplified,
+            "keywords": keywords,
+            "trace": trace,
+            "metrics": metrics
+        }
+        response_cache.set(cache_key, {"payload": payload, "sections": section_outputs})
+
+    baseline = None
+    if with_baseline:
+        start_baseline(baseline_key, sections, records, profile)
+        baseline = baseline_cache.get(baseline_key)
+    return dict(
+        payload,
+        original=original_text,
+        baseline=baseline,
+        baselineId=baseline_key if with_baseline else None,
+    )
+
+
+def run_simplify_job(job, data, tei_sections=None):
+    def on_section(section_name, text):
+        job.emit("section", {"section": section_name, "text": text})
+    return run_simplify(data, on_section=on_section, tei_sections=tei_sections)
+
+
+# === Health routes === #
+@app.route("/health", methods=["GET"])
+def health():
+    # The process is up and serving, models may still be loading
+    return jsonify({"status": "ok"})
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    # Ready to serve /simplify without waiting for a model load
+    is_ready = registry.ready()
+    return jsonify({"ready": is_ready, "resources": registry.status()}), (200 if is_ready else 503)
+
+
 # === Route === #
 @app.route("/simplify", methods=["POST"])
 def simplify():
     data = request.json
-    if "text" not in data:
-        return jsonify({"error": "Missing 'text' in request"}), 400
+    error, tei_sections = validate_simplify_request(data)
+    if error:
+        return jsonify({"error": error}), 400
 
-    original_text = data["text"]
-    simplified, keywords, trace , full_out  = simplify_text(original_text)
-    baseline = simplify_with_base_model(original_text)
+    return jsonify(run_simplify(data, tei_sections=tei_sections))
 
-    _, _, bert_f1 = score([full_out], [baseline], lang="en", verbose=False)
-    bert_score = bert_f1[0].item() * 100
 
-    complexity_model = calculate_complexity(full_out)
-    readability_model = calculate_readability(full_out, common_words)
-    wordfreq_model = calculate_word_freq_score(full_out, frequency_data) * 100
-    bertsim = calculate_embedding_similarity(full_out , baseline)
+# === Job routes === #
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    data = request.json
+    error, tei_sections = validate_simplify_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    job = job_manager.submit(run_simplify_job, data, tei_sections)
+    if job is None:
+        return jsonify({"error": "Too many pending jobs, try again later"}), 503
+    return jsonify({"id": job.id, "status": job.status}), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return Response(
+        job_manager.stream(job),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route("/metrics", methods=["POST"])
+def metrics():
+    data = request.json
+    if not data or "output" not in data:
+        return jsonify({"error": "Missing 'output' in request"}), 400
+
+    names = data.get("metrics", DEFAULT_METRICS)
+    error = validate_metrics(names)
+    if error:
+        return jsonify({"error": error}), 400
+    if "baseline" not in data and any(name in BASELINE_METRICS for name in names):
+        return jsonify({"error": "Missing 'baseline' in request, required by 'bert' and 'berts'"}), 400
+
+    return jsonify({"metrics": compute_metrics(data["output"], data.get("baseline", ""), names)})
+
+
+@app.route("/baseline/<baseline_id>", methods=["GET"])
+def get_baseline(baseline_id):
+    # Baseline started by /simplify or /jobs, under the baselineId of their response
+    with baseline_lock:
+        # run_baseline stores its result before leaving baseline_jobs, under this lock
+        baseline = baseline_cache.get(baseline_id)
+        running = baseline_id in baseline_jobs
+        error = baseline_errors.get(baseline_id)
+    if baseline is not None:
+        return jsonify({"status": "done", "baseline": baseline})
+    if running:
+        return jsonify({"status": "pending"}), 202
+    if error is not None:
+        return jsonify({"status": "error", "error": error}), 500
+    return jsonify({"error": "Unknown baseline"}), 404
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
     return jsonify({
-        "original": original_text,
-        "simplified": simplified,
-        "baseline": baseline,
-        "keywords": keywords,
-        "trace": trace,
-        "metrics": {
-            "readability": readability_model,
-            "complexity": complexity_model,
-            "frequencyScore": wordfreq_model,
-            "bert": bert_score,
-            "berts": bertsim
-        }
+        "responses": response_cache.stats(),
+        "chunks": chunk_cache.stats(),
+        "baselines": baseline_cache.stats(),
+        "baselineErrors": baseline_errors.stats(),
+        "embeddings": embedding_cache.stats(),
     })
 
 
@@ -233,6 +784,12 @@ def extract_pdf():
         return jsonify({'error': str(e)}), 500
 
 
+# === Warm-up === #
+# Load the models in the background right after startup, unless WARMUP=0.
+if os.environ.get("WARMUP", "1") == "1":
+    registry.warm_up(background=True)
+
+
 # === Run App === #
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host="0.0.0.0", debug=True, use_reloader=False, threaded=True)
\ No newline at end of file
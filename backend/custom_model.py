@@ -1,11 +1,18 @@
+import contextvars
 import torch
 import torch.nn as nn
 from transformers import T5ForConditionalGeneration
+from transformers.modeling_outputs import BaseModelOutput
 from transformers.models.t5.modeling_t5 import T5Attention,T5Block, T5LayerNorm, T5DenseActDense, T5Stack,T5Config
 import torch.nn.functional as F
 
 DEBUG = -2
 
+# importance_mask of the encoder call running in the current thread / context.
+# Set by CustomT5Stack.forward for the duration of the call and read by CustomT5Attention,
+# so concurrent requests sharing one model never see each other's masks.
+_current_importance_mask = contextvars.ContextVar("importance_mask", default=None)
+
 
 # === 1. Custom Attention that supports importance_mask ===
 class CustomT5Attention(T5Attention):
@@ -74,11 +81,6 @@ class CustomT5Attention(T5Attention):
         else:
             present_key_value_state = (None,)
 
-        # (bs, n_heads, qlen, klen)
-        scores = torch.matmul(
-            q, k.transpose(3, 2)
-        )
-
         if position_bias is None:
             if not self.has_relative_attention_bias:
                 raise ValueError("No position_bias provided and no weights to compute position_bias")
@@ -90,33 +92,46 @@ class CustomT5Attention(T5Attention):
             if mask is not None:
                 position_bias = position_bias + mask  # (bs, n_heads, qlen, klen)
 
-        
-        importance_mask = getattr(self, "importance_mask", None)
+        # position_bias (with the padding mask) is returned and reused by the next layers,
+        # the importance bias is added per layer on top of it.
+        attn_bias = position_bias
+        importance_mask = _current_importance_mask.get()
         if importance_mask is not None and not self.is_decoder:
             if DEBUG > 0:
                 print(f"[CustomT5Attention] Adding importance_mask: {importance_mask.shape}")
             if importance_mask.ndim == 2:
                 bias = importance_mask.unsqueeze(1).unsqueeze(2)  # [bs,1,1,klen]
-                if bias.size(-1) == scores.size(-1):
-                    scores = scores + bias
+                if bias.size(-1) == klen:
+                    attn_bias = position_bias + bias.to(position_bias.dtype)
                     if DEBUG > 0:
                         print(f"[CustomT5Attention] importance_mask injected as bias: {bias.shape}")
                 else:
                     if DEBUG > 0:
-                        print(f"[CustomT5Attention] importance_mask shape mismatch! bias={bias.shape}, scores={scores.shape}")
+                        print(f"[CustomT5Attention] importance_mask shape mismatch! bias={bias.shape}, klen={klen}")
             else:
                 if DEBUG > 0:
                     print(f"[CustomT5Attention] importance_mask must be [bs, seq_len], got {importance_mask.shape}")
 
-        scores += position_bias
+        if output_attentions or head_mask is not None:
+            # Explicit path: the attention weights are needed
+            scores = torch.matmul(q, k.transpose(3, 2))  # (bs, n_heads, qlen, klen)
+            scores += attn_bias
 
-        weights = F.softmax(scores.float(), dim=-1).type_as(scores)  # (bs, n_heads, qlen, klen)
-        weights = F.dropout(weights, p=self.dropout, training=self.training)  # (bs, n_heads, qlen, klen)
+            weights = F.softmax(scores.float(), dim=-1).type_as(scores)  # (bs, n_heads, qlen, klen)
+            weights = F.dropout(weights, p=self.dropout, training=self.training)  # (bs, n_heads, qlen, klen)
 
-        if head_mask is not None:
-            weights = weights * head_mask
+            if head_mask is not None:
+                weights = weights * head_mask
 
-        context = torch.matmul(weights, v)  # (bs, n_heads, qlen, dim_per_head)
+            context = torch.matmul(weights, v)  # (bs, n_heads, qlen, dim_per_head)
+        else:
+            # Fused kernel; T5 does not scale q @ k^T, hence scale=1.0
+            context = F.scaled_dot_product_attention(
+                q, k, v,
+                attn_mask=attn_bias.to(q.dtype),
+                dropout_p=self.dropout if self.training else 0.0,
+                scale=1.0,
+            )  # (bs, n_heads, qlen, dim_per_head)
         context = unshape(context)  # (bs, qlen, dim)
 
         context = self.o(context)
@@ -164,41 +179,30 @@ class CustomT5Stack(T5Stack):
             patched_block.load_state_dict(block.state_dict())
             new_blocks.append(patched_block)
         self.block = nn.ModuleList(new_blocks)
-        self._importance_mask = None
         if DEBUG > 0:
             print("[✅ CustomT5Stack] Initialized")
 
     def forward(self, input_ids=None, attention_mask=None, importance_mask=None, **kwargs):
-
-        if importance_mask is None:
-            importance_mask = getattr(self, "_importance_mask", None)
-            if DEBUG > 0:
-                print("[🧱 CustomT5Stack] Pulled importance_mask from self._importance_mask" if importance_mask is not None else "[🧱 CustomT5Stack] No importance_mask provided or stored")
-        else:
-            self._importance_mask = importance_mask
-            if DEBUG > 0:
+        # Only the mask passed to this call is used, a call without one runs unmasked.
+        if DEBUG > 0:
+            if importance_mask is not None:
                 print(f"[🧱 CustomT5Stack] Received importance_mask in forward, shape: {importance_mask.shape}")
-
-
-        for i, block in enumerate(self.block):
-            attention = block.layer[0].SelfAttention
-            if isinstance(attention, CustomT5Attention):
-                attention.importance_mask = importance_mask
-
-                if DEBUG > 1:
-                    print(f"[🔗 CustomT5Stack] Set importance_mask for block {i}")
             else:
-                if DEBUG > 0:
-                    print(f"[⚠️ CustomT5Stack] block {i} is not CustomT5Attention (type={type(attention)})")
-        
-        kwargs["use_cache"] = False
+                print("[🧱 CustomT5Stack] No importance_mask provided")
 
+        # Only the encoder uses this stack and the encoder has nothing to cache;
+        # the decoder is a stock T5Stack and keeps its KV cache during generate().
+        kwargs["use_cache"] = False
 
-        return super().forward(
-            input_ids=input_ids,
-            attention_mask=attention_mask,
-            **kwargs
-        )
+        token = _current_importance_mask.set(importance_mask)
+        try:
+            return super().forward(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                **kwargs
+            )
+        finally:
+            _current_importance_mask.reset(token)
 
 
 
@@ -213,37 +217,75 @@ class CustomT5(T5ForConditionalGeneration):
             print("[✅ CustomT5] Initialized with Custom Encoder Stack")
     
     def prepare_inputs_for_generation(
-        self, input_ids, past=None, attention_mask=None, use_cache=None, encoder_outputs=None, **kwargs
+        self, input_ids, past_key_values=None, attention_mask=None, use_cache=None, encoder_outputs=None,
+        cache_position=None, **kwargs
     ):
         importance_mask = kwargs.get("importance_mask", None)
 
-        # cut decoder_input_ids if past is used
-        if past is not None:
-            input_ids = input_ids[:, -1:]
-            
-            
+        # With a KV cache only the tokens not in the cache yet go through the decoder
+        if past_key_values is not None:
+            if hasattr(past_key_values, "get_seq_length"):
+                past_length = past_key_values.get_seq_length()
+            else:
+                past_length = past_key_values[0][0].shape[2]  # legacy tuple cache
+            # Some generation methods already pass only the last input id
+            if input_ids.shape[1] > past_length:
+                input_ids = input_ids[:, past_length:]
+            else:
+                input_ids = input_ids[:, -1:]
+
         if DEBUG > 0:
             print("[🛠️ prepare_inputs_for_generation] called from generate()")
             if importance_mask is not None:
                 print(f"[🛠️ prepare_inputs_for_generation] Got importance_mask with shape {importance_mask.shape}")
             else:
                 print("[🛠️ prepare_inputs_for_generation] No importance_mask received")
-                
-        if importance_mask is not None:
-            self.encoder._importance_mask = importance_mask
-            if DEBUG > 0:
-                print("[🛠️ prepare_inputs_for_generation] Stored importance_mask on encoder")
 
-        return {
+        # The encoder already consumed importance_mask when generate() built encoder_outputs,
+        # so it is not stored on the encoder or passed on to the decoding steps.
+        model_inputs = {
             "decoder_input_ids": input_ids,
-            "past_key_values": past,
+            "past_key_values": past_key_values,
             "encoder_outputs": encoder_outputs,
             "attention_mask": attention_mask,
             "use_cache": use_cache,
-            "importance_mask": importance_mask,  # <--- קריטי!
+        }
+        if cache_position is not None:
+            model_inputs["cache_position"] = cache_position
+        return model_inputs
+
+    def encode(self, input_ids, attention_mask=None, importance_mask=None):
+        """
+        Run the encoder once, to be reused with generate(encoder_outputs=...).
+        Returns: BaseModelOutput
+        """
+        return self.encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            importance_mask=importance_mask,
+            return_dict=True,
+        )
+
+    def encode_pair(self, input_ids, attention_mask, importance_mask):
+        """
+        Encode a batch without and with importance_mask from a single token embedding pass.
+        Both variants run through the encoder together as one [2 * bs, seq_len] batch.
+        Returns: (encoder_outputs, encoder_outputs_masked)
+        """
+        bs = input_ids.size(0)
+        inputs_embeds = self.encoder.embed_tokens(input_ids)
+        outputs = self.encoder(
+            inputs_embeds=torch.cat([inputs_embeds, inputs_embeds], dim=0),
+            attention_mask=torch.cat([attention_mask, attention_mask], dim=0),
+            importance_mask=torch.cat([torch.zeros_like(importance_mask), importance_mask], dim=0),
+            return_dict=True,
+        )
+        hidden_states = outputs.last_hidden_state
+        return (
+            BaseModelOutput(last_hidden_state=hidden_states[:bs]),
+            BaseModelOutput(last_hidden_state=hidden_states[bs:]),
+        )
 
-        }    
-   
     
     def forward(self, input_ids=None, attention_mask=None, importance_mask=None, **kwargs):
         if DEBUG > 0:
@@ -253,19 +295,24 @@ class CustomT5(T5ForConditionalGeneration):
             else:
                 print("[🧾 forward] importance_mask is None")
 
-        if importance_mask is None:
-            importance_mask = getattr(self.encoder, "_importance_mask", None)
-            if DEBUG > 0:
-                print("[🧾 forward] Pulled importance_mask from encoder._importance_mask" if importance_mask is not None else "[🧾 forward] No importance_mask on encoder")
-        else:
-            self.encoder._importance_mask = importance_mask  
+        # Run the encoder here with the mask, unless encoder_outputs were precomputed.
+        if importance_mask is not None and kwargs.get("encoder_outputs") is None:
+            kwargs["encoder_outputs"] = self.encoder(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                inputs_embeds=kwargs.pop("inputs_embeds", None),
+                head_mask=kwargs.get("head_mask"),
+                importance_mask=importance_mask,
+                output_attentions=kwargs.get("output_attentions"),
+                output_hidden_states=kwargs.get("output_hidden_states"),
+                return_dict=True,
+            )
             if DEBUG > 0:
-                print("[🧾 forward] Stored importance_mask on encoder")
+                print("[🧾 forward] Encoded input with importance_mask")
 
         return super().forward(
             input_ids=input_ids,
             attention_mask=attention_mask,
-         
             **kwargs
         )
 
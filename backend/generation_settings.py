@@ -0,0 +1,32 @@
+"""
+Model path and decoding settings shared by the app and the benchmarks.
+Importing this module loads nothing (unlike customApp, which registers and warms up the models).
+"""
+import os
+
+MODEL_PATH = "./MODEL/t5-custom"
+
+# Decoding settings of the custom model, selected per request with "profile".
+# "balanced" is greedy decoding of up to 256 tokens, "quality" uses beam search.
+GENERATION_PROFILES = {
+    "fast": {"max_length": 128, "min_length": 5, "num_beams": 1, "do_sample": False},
+    "balanced": {"max_length": 256, "min_length": 5, "num_beams": 1, "do_sample": False},
+    "quality": {
+        "max_length": 256, "min_length": 5, "num_beams": 4, "do_sample": False,
+        "no_repeat_ngram_size": 3, "early_stopping": True,
+    },
+}
+DEFAULT_PROFILE = os.environ.get("GENERATION_PROFILE", "balanced")
+if DEFAULT_PROFILE not in GENERATION_PROFILES:
+    raise ValueError(f"GENERATION_PROFILE must be one of: {', '.join(GENERATION_PROFILES)}")
+
+# The baseline keeps its sampling settings and takes max_length from the profile
+BASELINE_GENERATION_KWARGS = {
+    "do_sample": True,
+    "top_k": 50,
+    "top_p": 0.9,
+    "temperature": 0.8,
+    "repetition_penalty": 2.0,
+    "no_repeat_ngram_size": 3,
+    "num_return_sequences": 1,
+}
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """
+    One background simplification job.
+    status: "queued" -> "running" -> "done" | "error"
+    events: list of (event_name, data) tuples, in the order they were emitted.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    def emit(self, event, data):
+        with self.cond:
+            self.events.append((event, data))
+            self.cond.notify_all()
+
+    def set_running(self):
+        with self.cond:
+            self.status = "running"
+            self.cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self.cond:
+            self.result = result
+            self.error = error
+            self.status = "error" if error is not None else "done"
+            if error is not None:
+                self.events.append(("error", {"error": error}))
+            else:
+                self.events.append(("done", {"id": self.id}))
+            self.cond.notify_all()
+
+    def to_dict(self):
+        with self.cond:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "sections": [data for event, data in self.events if event == "section"],
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+def format_sse(event, data):
+    """
+    Format one Server-Sent Events message.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps the most recent ones in memory.
+    max_workers: number of jobs running at the same time
+    max_pending: queued + running jobs accepted before submit() refuses new ones
+    max_jobs: finished jobs kept for GET /jobs/<id> before the oldest are dropped
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, max_jobs=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simplify-job")
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """
+        Schedule fn(job, *args); its return value becomes the job result.
+        Returns: the Job, or None if too many jobs are already pending.
+        """
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                return None
+            job = Job()
+            self.jobs[job.id] = job
+            self._evict()
+        self.executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stream(self, job, heartbeat=15):
+        """
+        Yield the job's events as Server-Sent Events, from the first one until the job finishes.
+        A comment line is sent every `heartbeat` seconds without events to keep the connection open.
+        """
+        index = 0
+        while True:
+            with job.cond:
+                if index >= len(job.events) and not job.finished:
+                    job.cond.wait(timeout=heartbeat)
+                pending = job.events[index:]
+                finished = job.finished
+            index += len(pending)
+
+            if not pending and not finished:
+                yield ": keep-alive\n\n"
+                continue
+            for event, data in pending:
+                yield format_sse(event, data)
+            if finished:
+                return
+
+    def _run(self, job, fn, args):
+        job.set_running()
+        try:
+            result = fn(job, *args)
+        except Exception as e:
+            logging.exception(f"[❌ Job {job.id}] failed")
+            job.finish(error=str(e))
+        else:
+            job.finish(result=result)
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        while len(self.jobs) > self.max_jobs and finished:
+            del self.jobs[finished.pop(0)]
@@ -0,0 +1,176 @@
+"""
+Compact read-only word -> float lexicon, stored as a binary file and memory-mapped.
+
+Opening a lexicon only maps the file: nothing is parsed, so it loads in milliseconds, and
+worker processes mapping the same file share its pages through the OS page cache.
+
+File layout (native byte order: a lexicon is built on the machine that uses it, e.g. in the Docker build):
+    header   MAGIC, version, count, keys_size        (4s I I I)
+    offsets  (count + 1) uint32, start of each key in the keys blob
+    values   count float32
+    keys     UTF-8 keys, sorted by their bytes, concatenated
+
+Converter CLI (from backend/):
+    python lexicon.py freq words_219k.txt            -> words_219k.lex (normalized frequencies)
+    python lexicon.py words google-10000-english.txt -> google-10000-english.lex (word list, values 1.0)
+"""
+import argparse
+import csv
+import logging
+import mmap
+import os
+import struct
+from array import array
+from functools import lru_cache
+
+MAGIC = b"LEX1"
+VERSION = 1
+HEADER = struct.Struct("=4sIII")
+
+
+def read_frequency_file(file_path):
+    """
+    Parse a word frequency TSV (columns 'word' and 'freq').
+    Returns: dict {lowercase word: frequency / max frequency}
+    """
+    frequency_data = {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file, delimiter='\t')
+        for row in reader:
+            word = row['word'].strip().lower()
+            freq = int(row['freq'])
+            frequency_data[word] = freq
+
+    max_freq = max(frequency_data.values())
+    for word in frequency_data:
+        frequency_data[word] /= max_freq
+    return frequency_data
+
+
+def read_word_list(path):
+    """
+    Returns: set of the lowercase words of a one-word-per-line file
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return set(line.strip().lower() for line in file)
+
+
+def write_lexicon(path, items):
+    """
+    Write a {word: float} mapping (or (word, float) pairs) as a lexicon file.
+    """
+    entries = sorted((word.encode("utf-8"), value) for word, value in dict(items).items())
+    offsets = array("I", [0])
+    values = array("f")
+    for key, value in entries:
+        offsets.append(offsets[-1] + len(key))
+        values.append(value)
+    keys = b"".join(key for key, _ in entries)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), len(keys)))
+        f.write(offsets.tobytes())
+        f.write(values.tobytes())
+        f.write(keys)
+    os.replace(tmp_path, path)
+
+
+class Lexicon:
+    """
+    Memory-mapped lexicon file. Supports `word in lexicon`, `lexicon[word]`, `lexicon.get(word)`
+    and len(), like the dict / set it replaces. Lookups are a binary search over the sorted keys.
+    Thread-safe: the mapping is read-only.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, keys_size = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} lexicon file")
+        view = memoryview(self.mm)
+        offsets_start = HEADER.size
+        values_start = offsets_start + 4 * (count + 1)
+        keys_start = values_start + 4 * count
+        if len(self.mm) != keys_start + keys_size:
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+        self.offsets = view[offsets_start:values_start].cast("I")
+        self.values = view[values_start:keys_start].cast("f")
+        self.keys_start = keys_start
+        # Texts repeat their words, so recent lookups are memoized (per process)
+        self._find = lru_cache(maxsize=65536)(self._find)
+
+    def _key(self, i):
+        return self.mm[self.keys_start + self.offsets[i]:self.keys_start + self.offsets[i + 1]]
+
+    def _find(self, word):
+        """
+        Returns: index of `word`, or -1
+        """
+        key = word.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self._key(lo) == key else -1
+
+    def get(self, word, default=None):
+        i = self._find(word)
+        return self.values[i] if i >= 0 else default
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def __getitem__(self, word):
+        i = self._find(word)
+        if i < 0:
+            raise KeyError(word)
+        return self.values[i]
+
+    def __len__(self):
+        return self.count
+
+    def words(self):
+        return [self._key(i).decode("utf-8") for i in range(self.count)]
+
+
+def lexicon_path(source_path):
+    return os.path.splitext(source_path)[0] + ".lex"
+
+
+def load_lexicon(source_path, fallback):
+    """
+    Open the prebuilt lexicon of `source_path` (same name, .lex extension).
+    Without one, or if it is older than the source file, fallback(source_path) parses the source.
+    """
+    path = lexicon_path(source_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path):
+        return Lexicon(path)
+    logging.warning(f"[📚 Lexicon] No up-to-date {path}, parsing {source_path} (build it with lexicon.py)")
+    return fallback(source_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=["freq", "words"], help="word frequency TSV or one-word-per-line list")
+    parser.add_argument("source")
+    parser.add_argument("-o", "--output", help="default: the source path with a .lex extension")
+    args = parser.parse_args()
+
+    if args.kind == "freq":
+        items = read_frequency_file(args.source)
+    else:
+        items = dict.fromkeys(read_word_list(args.source), 1.0)
+    output = args.output or lexicon_path(args.source)
+    write_lexicon(output, items)
+    print(f"{output}: {len(items)} words, {os.path.getsize(output) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,187 @@
 # improved_metrics_new.py
-import csv
 import spacy
 import textstat
+import os
 import re
+from functools import lru_cache
 
 from collections import Counter
 from tqdm import tqdm
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from scipy.spatial.distance import cosine
+from bert_score import BERTScorer
+from model_registry import registry
+from cache import ResultCache, make_key
+from lexicon import read_frequency_file, read_word_list
 
-# Load spaCy NLP pipeline once globally
-nlp = spacy.load("en_core_web_sm")
-sbert_model = SentenceTransformer("all-MiniLM-L6-v2")
+# spaCy and SBERT are loaded once, on first use. SBERT ("berts" metric) is also preloaded by
+# the registry warm-up; spaCy is only used by avg_sentence_length, which no route calls,
+# so /ready does not wait for it.
+registry.register("spacy", lambda: spacy.load("en_core_web_sm"), warm=False)
+registry.register("sbert", lambda: SentenceTransformer("all-MiniLM-L6-v2"))
+# BERTScore (roberta-large) is only warmed up when PRELOAD_BERTSCORE=1
+registry.register("bertscore", lambda: BERTScorer(lang="en"), warm=os.environ.get("PRELOAD_BERTSCORE") == "1")
+
+# Normalized SBERT embeddings by text hash: baselines and references repeat across runs
+embedding_cache = ResultCache("embeddings", max_items=int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000")))
 
 
 def load_common_words(path="google-10000-english.txt"):
-    with open(path, "r", encoding="utf-8") as file:
-        return set(line.strip().lower() for line in file)
+    return read_word_list(path)
 
 
 def load_frequency_data(file_path):
-    frequency_data = {}
-    with open(file_path, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file, delimiter='\t') 
-        for row in reader:
-            word = row['word'].strip().lower()
-            freq = int(row['freq'])
-            frequency_data[word] = freq
-
-    max_freq = max(frequency_data.values())
-    for word in frequency_data:
-        frequency_data[word] /= max_freq 
-    return frequency_data
+    return read_frequency_file(file_path)
 
 
 def calculate_word_freq_score(text, frequency_data):
+    """
+    frequency_data: dict or lexicon.Lexicon {word: normalized frequency}
+    """
     words = text.lower().split()
     score, count = 0, 0
     for word in words:
-        word = word.strip(".,!?\"'")
-        if word in frequency_data:
-            score += frequency_data[word]
+        value = frequency_data.get(word.strip(".,!?\"'"))
+        if value is not None:
+            score += value
             count += 1
     return (score / count) if count else 0
 
 
 def avg_sentence_length(text):
-    doc = nlp(text)
+    doc = registry.get("spacy")(text)
     sentences = list(doc.sents)
     return len(text.split()) / len(sentences) if sentences else 0
 
 
-def avg_syllables_per_word(text):
-    words = text.split()
-    if not words:
-        return 0
-    return sum(textstat.syllable_count(word) for word in words) / len(words)
+# === Text statistics === #
+# Sentences are the non-blank runs between ., ! and ? (same as re.split(r'[.!?]+') minus blank pieces)
+SENTENCE_RE = re.compile(r'[^.!?]+')
 
 
+@lru_cache(maxsize=200000)
+def word_syllables(word):
+    """
+    textstat.syllable_count of one word, memoized. textstat lowercases the word itself,
+    so callers pass it lowercased to share one cache entry between "The" and "the".
+    """
+    return textstat.syllable_count(word)
 
 
-def calculate_complexity(text):
-    words = text.split()
-    if not words:
+class TextStats:
+    """
+    Tokenize-once analysis of a text, shared by the readability and complexity scores:
+    words (whitespace split), sentence spans and the syllable count of every word.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.words = text.split()
+        self.sentence_spans = [m.span() for m in SENTENCE_RE.finditer(text) if not m.group().isspace()]
+        self.syllables = [word_syllables(word.lower()) for word in self.words]
+
+    @property
+    def total_words(self):
+        return len(self.words)
+
+    @property
+    def total_sentences(self):
+        return len(self.sentence_spans)
+
+    @property
+    def total_syllables(self):
+        return sum(self.syllables)
+
+    @property
+    def avg_syllables(self):
+        return self.total_syllables / self.total_words if self.words else 0
+
+    @property
+    def avg_word_length(self):
+        return sum(len(w) for w in self.words) / self.total_words if self.words else 0
+
+    @property
+    def complex_word_ratio(self):
+        return sum(1 for count in self.syllables if count >= 3) / self.total_words if self.words else 0
+
+
+def text_stats_many(texts):
+    """
+    TextStats of many documents. Syllables are counted once per distinct word across all of them.
+    """
+    return [TextStats(text) for text in texts]
+
+
+def avg_syllables_per_word(text):
+    return TextStats(text).avg_syllables
+
+
+def complexity_score(stats):
+    if not stats.words:
         return 0
-    total_words = len(words)
-    avg_syllables = avg_syllables_per_word(text)
-    avg_word_length = sum(len(w) for w in words) / total_words
-    complex_word_ratio = sum(
-        1 for w in words if textstat.syllable_count(w) >= 3
-    ) / total_words
-
-    s_score = normalize(avg_syllables, 1, 3)
-    c_score = normalize(complex_word_ratio, 0, 0.6)
-    l_score = normalize(avg_word_length, 3, 8)
+    s_score = normalize(stats.avg_syllables, 1, 3)
+    c_score = normalize(stats.complex_word_ratio, 0, 0.6)
+    l_score = normalize(stats.avg_word_length, 3, 8)
     return 0.4 * s_score + 0.4 * c_score + 0.2 * l_score
 
 
-def flesch_reading_ease_fixed(text):
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s for s in sentences if s.strip()]
-    total_sentences = len(sentences)
-    words = text.split()
-    total_words = len(words)
-    total_syllables = sum(textstat.syllable_count(word) for word in words)
-    if total_sentences == 0 or total_words == 0:
+def flesch_score(stats):
+    if stats.total_sentences == 0 or stats.total_words == 0:
         return 0
-    score = 206.835 - 1.015 * (total_words / total_sentences) - 84.6 * (total_syllables / total_words)
+    score = (
+        206.835
+        - 1.015 * (stats.total_words / stats.total_sentences)
+        - 84.6 * (stats.total_syllables / stats.total_words)
+    )
     return max(0, min(score, 100))
 
 
-def calculate_readability(text, common_words_set):
-    if not text.strip():
-        return 0
-    words = text.split()
-    total_words = len(words)
-    if total_words == 0:
+def readability_score(stats, common_words_set):
+    """
+    common_words_set: any container of lowercase words (set, lexicon.Lexicon)
+    """
+    if not stats.words:
         return 0
-    flesch_score = flesch_reading_ease_fixed(text)
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s for s in sentences if s.strip()]
-    avg_sentence_len = total_words / max(1, len(sentences))
-    common_count = sum(1 for word in words if word.lower().strip(".,!?\"'") in common_words_set)
+    total_words = stats.total_words
+    avg_sentence_len = total_words / max(1, stats.total_sentences)
+    common_count = sum(1 for word in stats.words if word.lower().strip(".,!?\"'") in common_words_set)
     common_ratio = common_count / total_words
     score = (
-        flesch_score * 0.7 +
+        flesch_score(stats) * 0.7 +
         (1 - avg_sentence_len / 25) * 0.15 +
         common_ratio * 0.15
     )
     return max(0, min(score, 100))
 
 
+def calculate_complexity(text):
+    return complexity_score(TextStats(text))
+
+
+def flesch_reading_ease_fixed(text):
+    return flesch_score(TextStats(text))
+
+
+def calculate_readability(text, common_words_set):
+    return readability_score(TextStats(text), common_words_set)
+
+
+def calculate_complexity_many(texts):
+    """
+    Complexity of many documents.
+    Returns: list of scores, one per text
+    """
+    return [complexity_score(stats) for stats in text_stats_many(texts)]
+
+
+def calculate_readability_many(texts, common_words_set):
+    """
+    Readability of many documents.
+    Returns: list of scores, one per text
+    """
+    return [readability_score(stats, common_words_set) for stats in text_stats_many(texts)]
+
+
 def normalize(value, min_val, max_val):
     normalized = (max_val - value) / (max_val - min_val)
     return max(0, min(100, normalized * 100))
@@ -129,10 +200,60 @@ def f1(p, r):
     return 2 * p * r / (p + r)
 
 
+def embed_sentences(texts, batch_size=64):
+    """
+    Normalized SBERT embeddings of texts. Cached embeddings are reused, the other
+    (distinct) texts are encoded together in batches and added to the cache.
+    Returns: float32 array [len(texts), dim]
+    """
+    keys = [make_key("sbert", text) for text in texts]
+    embeddings = {key: embedding_cache.get(key) for key in set(keys)}
+    missing = {key: text for key, text in zip(keys, texts) if embeddings[key] is None}
+    if missing:
+        vectors = registry.get("sbert").encode(
+            list(missing.values()), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+        for key, vector in zip(missing, vectors):
+            embeddings[key] = vector
+            embedding_cache.set(key, vector)
+    return np.stack([embeddings[key] for key in keys])
+
+
+def calculate_embedding_similarity_many(generated_texts, reference_texts, batch_size=64):
+    """
+    SBERT cosine similarity (0-100) of many (generated, reference) pairs,
+    embedded together in batches and compared with one matrix operation.
+    Returns: list of scores, one per pair
+    """
+    if not generated_texts:
+        return []
+    embeddings = embed_sentences(list(generated_texts) + list(reference_texts), batch_size)
+    generated, reference = embeddings[:len(generated_texts)], embeddings[len(generated_texts):]
+    similarity = np.einsum("ij,ij->i", generated, reference)
+    return [float(value) * 100 for value in similarity]
+
+
 def calculate_embedding_similarity(generated_text, reference_text):
+    return calculate_embedding_similarity_many([generated_text], [reference_text])[0]
+
+
+def get_bert_scorer():
+    """
+    Return the shared BERTScorer, loading its model on the first call.
+    """
+    return registry.get("bertscore")
+
+
+def calculate_bert_score_many(generated_texts, reference_texts, batch_size=64):
+    """
+    BERTScore F1 (0-100) of many (generated, reference) pairs, scored together in batches.
+    Returns: list of scores, one per pair
+    """
+    if not generated_texts:
+        return []
+    _, _, f1 = get_bert_scorer().score(list(generated_texts), list(reference_texts), batch_size=batch_size)
+    return [value * 100 for value in f1.tolist()]
 
-    gen_emb = sbert_model.encode(generated_text, convert_to_tensor=False)
-    ref_emb = sbert_model.encode(reference_text, convert_to_tensor=False)
 
-    similarity = 1 - cosine(gen_emb, ref_emb)
-    return similarity * 100
+def calculate_bert_score(generated_text, reference_text):
+    return calculate_bert_score_many([generated_text], [reference_text])[0]
@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Named heavy resources (models, tokenizers, word lists) loaded lazily on first use.
+    Each resource is loaded at most once, even when several threads ask for it at the same time.
+    Resources registered with warm=True are preloaded by warm_up() and count towards ready().
+    Tokenizers registered with register_tokenizer() are shared between names when they are identical.
+    """
+
+    def __init__(self):
+        self.loaders = {}
+        self.warm = {}
+        self.resources = {}
+        self.locks = {}
+        self.errors = {}
+        self.loading = set()
+        self.lock = threading.Lock()
+        self.tokenizers = {}
+        self.tokenizer_paths = {}
+
+    def register(self, name, loader, warm=True):
+        with self.lock:
+            self.loaders[name] = loader
+            self.warm[name] = warm
+            self.locks.setdefault(name, threading.Lock())
+
+    def register_tokenizer(self, name, path, warm=True):
+        """
+        Register a fast (Rust) T5 tokenizer. Tokenizers with the same vocabulary and pipeline
+        resolve to one shared instance, whatever name or path they were registered under.
+        The shared instances are used from several threads: call them without truncation/padding
+        arguments, which would reconfigure the Rust tokenizer under the other callers.
+        """
+        self.register(name, lambda: self._shared_tokenizer(path), warm)
+
+    def _shared_tokenizer(self, path):
+        with self.lock:
+            if path in self.tokenizer_paths:
+                return self.tokenizer_paths[path]
+        from transformers import T5TokenizerFast
+        tokenizer = T5TokenizerFast.from_pretrained(path)
+        key = tokenizer_fingerprint(tokenizer)
+        with self.lock:
+            tokenizer = self.tokenizers.setdefault(key, tokenizer)
+            self.tokenizer_paths[path] = tokenizer
+        return tokenizer
+
+    def get(self, name):
+        """
+        Return the resource, loading it first if needed.
+        """
+        if name in self.resources:
+            return self.resources[name]
+        if name not in self.loaders:
+            raise KeyError(f"Unknown resource '{name}'")
+
+        with self.locks[name]:
+            if name not in self.resources:
+                self.loading.add(name)
+                start = time.time()
+                logging.info(f"[📦 Registry] Loading {name}...")
+                try:
+                    self.resources[name] = self.loaders[name]()
+                    self.errors.pop(name, None)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    raise
+                finally:
+                    self.loading.discard(name)
+                logging.info(f"[📦 Registry] Loaded {name} in {time.time() - start:.1f}s")
+        return self.resources[name]
+
+    def status(self):
+        """
+        Returns: dict {name: "loaded" | "loading" | "error" | "pending"}
+        """
+        status = {}
+        for name in list(self.loaders):
+            if name in self.resources:
+                status[name] = "loaded"
+            elif name in self.loading:
+                status[name] = "loading"
+            elif name in self.errors:
+                status[name] = "error"
+            else:
+                status[name] = "pending"
+        return status
+
+    def ready(self):
+        """
+        True once every resource registered with warm=True is loaded.
+        """
+        return all(name in self.resources for name, warm in list(self.warm.items()) if warm)
+
+    def warm_up(self, background=True):
+        """
+        Load every warm resource, in a daemon thread if `background` is set.
+        A failing resource is logged and left to be retried on first use.
+        """
+        def load_all():
+            for name, warm in list(self.warm.items()):
+                if not warm:
+                    continue
+                try:
+                    self.get(name)
+                except Exception:
+                    logging.exception(f"[❌ Registry] Failed to load {name}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+def tokenizer_fingerprint(tokenizer):
+    """
+    Hash of a fast tokenizer's full serialized pipeline (vocab, normalizer, pre-tokenizer, special tokens).
+    """
+    return hashlib.sha256(tokenizer.backend_tokenizer.to_str().encode("utf-8")).hexdigest()
+
+
+# Shared by customApp, utils and metrics_new
+registry = ModelRegistry()
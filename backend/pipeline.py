@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+_DONE = object()
+
+
+class Producer:
+    """
+    Run work(item) for every item, in order, on a pool thread, and hand the results to the
+    consumer through a bounded queue: the producer stays at most `maxsize` results ahead,
+    so CPU-side preparation overlaps with whatever the consumer does with earlier results.
+    An exception raised by work() is re-raised in the consumer.
+    """
+
+    def __init__(self, pool, work, items, maxsize=2):
+        self.queue = queue.Queue(maxsize)
+        self.stop = threading.Event()
+        self.done = False
+        self.future = pool.submit(self._run, work, list(items))
+
+    def _run(self, work, items):
+        try:
+            for item in items:
+                if self.stop.is_set():
+                    return
+                self._put((item, work(item), None))
+        except Exception as e:
+            self._put((None, None, e))
+            return
+        self._put(_DONE)
+
+    def _put(self, entry):
+        # Give up once the consumer is gone instead of blocking on a full queue forever
+        while not self.stop.is_set():
+            try:
+                self.queue.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def next_ready(self):
+        """
+        Wait for the next result, then also take every result that is already waiting.
+        Returns: list of (item, result) in item order, empty once every item was consumed
+        """
+        if self.done:
+            return []
+        entries = [self.queue.get()]
+        while True:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        results = []
+        for entry in entries:
+            if entry is _DONE:
+                self.done = True
+                break
+            item, result, error = entry
+            if error is not None:
+                self.close()
+                raise error
+            results.append((item, result))
+        return results
+
+    def close(self):
+        self.stop.set()
+
+
+class StageTimer:
+    """
+    Wall-clock seconds spent per named stage, summed over calls and threads.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        """
+        Returns: dict {stage: seconds}, rounded to the millisecond
+        """
+        with self.lock:
+            return {name: round(seconds, 3) for name, seconds in self.seconds.items()}
@@ -0,0 +1,86 @@
+import os
+import sys
+import zlib
+import numpy as np
+import pytest
+import torch
+from keybert import KeyBERT
+from keybert.backend import BaseEmbedder
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+from transformers import T5Config, T5TokenizerFast
+
+# Backend modules that have no copy in tests/ are imported from the backend directory.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from custom_model import CustomT5
+from model_registry import registry
+
+# === Offline fakes shared by the tests === #
+TOKENIZER_WORDS = ("the a of and in from with is are on model models data protein structure sequence deep learning "
+                   "predict predicts climate rainfall tropical regions results introduction methods").split()
+
+
+class HashEmbedder(BaseEmbedder):
+    """
+    Deterministic bag-of-words embedder, so keyword tests run without downloading a model.
+    """
+    def embed(self, documents, verbose=False):
+        vectors = np.zeros((len(documents), 64))
+        for i, doc in enumerate(documents):
+            for word in doc.lower().split():
+                vectors[i, zlib.crc32(word.encode()) % 64] += 1
+        return vectors
+
+
+@pytest.fixture
+def hash_keybert(monkeypatch):
+    """
+    KeyBERT over HashEmbedder, registered as the "keybert" resource.
+    """
+    keybert = KeyBERT(model=HashEmbedder())
+    monkeypatch.setitem(registry.resources, "keybert", keybert)
+    return keybert
+
+
+@pytest.fixture
+def tiny_tokenizer():
+    """
+    T5TokenizerFast built in memory: a Unigram vocabulary of whole words plus single characters,
+    so any text can be encoded without downloading a tokenizer.
+    """
+    vocab = [("<pad>", 0.0), ("</s>", 0.0), ("<unk>", 0.0), ("▁", -3.0)]
+    vocab += [("▁" + word, -1.0) for word in TOKENIZER_WORDS]
+    vocab += [(char, -5.0) for char in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,;:()-'"]
+    tokenizer = Tokenizer(models.Unigram(vocab, unk_id=2))
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.decoder = decoders.Metaspace()
+    return T5TokenizerFast(tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>", unk_token="<unk>", extra_ids=0)
+
+
+@pytest.fixture
+def make_tiny_model():
+    """
+    Returns: make_tiny_model(vocab_size=100, seed=0), building a 2-layer CustomT5 in eval mode
+    """
+    def make(vocab_size=100, seed=0):
+        torch.manual_seed(seed)
+        config = T5Config(
+            vocab_size=vocab_size, d_model=32, d_kv=8, d_ff=64, num_layers=2, num_decoder_layers=2,
+            num_heads=4, decoder_start_token_id=0, pad_token_id=0, eos_token_id=1, dropout_rate=0.0
+        )
+        return CustomT5(config).eval()
+    return make
+
+
+@pytest.fixture
+def make_inputs():
+    """
+    Returns: make_inputs(), building (input_ids, attention_mask, importance_mask) for a padded batch of 2
+    """
+    def make():
+        input_ids = torch.randint(2, 100, (2, 12))
+        attention_mask = torch.ones_like(input_ids)
+        attention_mask[1, 8:] = 0
+        importance_mask = torch.zeros(2, 12)
+        importance_mask[:, [3, 5]] = 2.6
+        return input_ids, attention_mask, importance_mask
+    return make
@@ -0,0 +1,245 @@
+import os
+os.environ.setdefault("WARMUP", "0")
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import customApp
+from cache import ResultCache
+from model_registry import registry
+
+
+@pytest.fixture
+def app(monkeypatch, tiny_tokenizer, make_tiny_model, hash_keybert):
+    """
+    customApp with tiny offline models in the registry and empty in-memory caches.
+    """
+    resources = {
+        "tokenizer": tiny_tokenizer,
+        "default_tokenizer": tiny_tokenizer,
+        "model": make_tiny_model(len(tiny_tokenizer), seed=0),
+        "default_model": make_tiny_model(len(tiny_tokenizer), seed=1),
+        "common_words": {"the", "a", "of", "and", "data"},
+        "frequency_data": {"the": 1.0, "data": 0.5},
+    }
+    for name, resource in resources.items():
+        monkeypatch.setitem(registry.resources, name, resource)
+    for name in ("response_cache", "chunk_cache", "baseline_cache", "baseline_errors"):
+        monkeypatch.setattr(customApp, name, ResultCache(name))
+    return customApp
+
+
+ARTICLE = (
+    "Introduction\n" + " ".join(["Deep learning models predict protein structure from sequence data."] * 20)
+    + "\nResults\n" + " ".join(["The climate model predicts rainfall in tropical regions."] * 15)
+)
+
+def section_texts(count):
+    return {
+        f"Section {i}": f"Deep learning models predict protein structure {i} from sequence data."
+        for i in range(count)
+    }
+
+def test_simplify_text_generates_full_micro_batches(app, monkeypatch):
+    sizes = []
+    def fake_generate_batch(records, mode="fast", profile=app.DEFAULT_PROFILE):
+        sizes.append(len(records))
+        for record in records:
+            record.update(input_ids=record["ids"][:20], importance_mask=[], output_masked="simple text", output=None)
+    monkeypatch.setattr(app, "generate_batch", fake_generate_batch)
+    keyword_calls = []
+    build_keyword_indexes = app.build_keyword_indexes
+    def counting_build_keyword_indexes(texts):
+        keyword_calls.append(len(texts))
+        return build_keyword_indexes(texts)
+    monkeypatch.setattr(app, "build_keyword_indexes", counting_build_keyword_indexes)
+
+    # Every section is its own group: chunks still wait for a full micro-batch
+    monkeypatch.setattr(app, "CHUNK_CHARS", 1)
+    sections = section_texts(16)
+    simplified, keywords, trace, _ = app.simplify_text("", batch_size=8, sections=sections)
+    assert sizes == [8, 8]
+    assert list(keywords) == list(sections)
+    assert simplified.count("simple text") == 16
+
+    # Small sections are prepared in one group, with one keyword embedding batch
+    monkeypatch.setattr(app, "CHUNK_CHARS", 1800)
+    sizes.clear()
+    keyword_calls.clear()
+    app.simplify_text("", batch_size=8, sections=section_texts(20), profile="fast")
+    assert sizes == [8, 8, 4]
+    assert keyword_calls == [20]
+
+def test_baseline_route_reports_each_state(app):
+    client = app.app.test_client()
+    with app.baseline_lock:
+        app.baseline_jobs["running"] = object()
+    try:
+        assert client.get("/baseline/running").status_code == 202
+    finally:
+        app.baseline_jobs.pop("running")
+
+    # Finished: stored in the cache, no longer in baseline_jobs
+    app.baseline_cache.set("finished", "a baseline")
+    response = client.get("/baseline/finished")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "done", "baseline": "a baseline"}
+
+    app.baseline_errors.set("failed", "out of memory")
+    assert client.get("/baseline/failed").status_code == 500
+    assert client.get("/baseline/unknown").status_code == 404
+
+def test_simplify_rejects_invalid_metrics_before_checking_the_baseline(app):
+    response = app.app.test_client().post("/simplify", json={"text": "Some text.", "baseline": False, "metrics": 5})
+    assert response.status_code == 400
+    assert "Invalid 'metrics'" in response.get_json()["error"]
+
+def test_comparison_metrics_start_the_baseline_before_the_custom_model(app, monkeypatch):
+    simplify_text = app.simplify_text
+    running = []
+    def checking_simplify_text(*args, **kwargs):
+        running.append(set(app.baseline_jobs) | set(app.baseline_cache.items))
+        return simplify_text(*args, **kwargs)
+    monkeypatch.setattr(app, "simplify_text", checking_simplify_text)
+    monkeypatch.setitem(app.METRICS, "berts", lambda output, baseline: float(len(baseline)))
+
+    text = "Introduction\n" + " ".join(["Deep learning models predict protein structure."] * 30)
+    data = {"text": text, "metrics": ["berts"], "profile": "fast"}
+    payload = app.run_simplify(data)
+    assert running == [{payload["baselineId"]}]
+    assert payload["baseline"] == app.baseline_cache.get(payload["baselineId"])
+    assert payload["metrics"]["berts"] == len(payload["baseline"])
+
+    # Cut from the sections, the baseline chunks are the ones simplify_text fed the custom model
+    sections = app.prepare_sections(text)
+    records = []
+    simplify_text("", sections=sections, profile="fast", chunks=records)
+    assert app.baseline_chunk_ids(sections) == app.baseline_chunk_ids(sections, records)
+
+def test_simplify_parses_the_tei_once(app, monkeypatch):
+    calls = []
+    split_tei_sections = app.split_tei_sections
+    def counting_split_tei_sections(xml):
+        calls.append(xml)
+        return split_tei_sections(xml)
+    monkeypatch.setattr(app, "split_tei_sections", counting_split_tei_sections)
+    tei = ('<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+           '<div><head>Methods</head><p>Deep learning models predict protein structure.</p></div>'
+           '</body></text></TEI>')
+
+    response = app.app.test_client().post("/simplify", json={"text": "", "tei": tei, "baseline": False})
+    assert response.status_code == 200
+    assert list(response.get_json()["keywords"]) == ["Methods"]
+    assert len(calls) == 1
+
+def test_generate_batch_maps_outputs_back_to_rows(app, monkeypatch):
+    calls = []
+    def fake_run_generate(encoder_outputs, attention_mask, profile=app.DEFAULT_PROFILE):
+        rows = attention_mask.shape[0]
+        assert encoder_outputs.last_hidden_state.shape[0] == rows
+        calls.append(rows)
+        if len(calls) == 1:
+            return ["masked 0", "", "masked 2", " "]
+        return [f"plain {j}" for j in range(rows)]
+    monkeypatch.setattr(app, "run_generate", fake_run_generate)
+    tokenizer = registry.get("tokenizer")
+    texts = ["Deep learning.", "The climate model predicts rainfall.", "Protein data.", "Results of the methods."]
+    def make_records():
+        return [{"ids": ids, "keywords": ["protein"]} for ids in tokenizer(texts)["input_ids"]]
+
+    # "fast": the unmasked pass only runs for the rows whose masked output is empty
+    records = make_records()
+    app.generate_batch(records, mode="fast")
+    assert calls == [4, 2]
+    assert [record["output_masked"] for record in records] == ["masked 0", "", "masked 2", " "]
+    assert [record["output"] for record in records] == [None, "plain 0", None, "plain 1"]
+    assert all(record["input_ids"] == record["ids"][:20] for record in records)
+
+    calls.clear()
+    records = make_records()
+    app.generate_batch(records, mode="diagnostic")
+    assert calls == [4, 4]
+    assert [record["output"] for record in records] == ["plain 0", "plain 1", "plain 2", "plain 3"]
+
+def test_simplify_replays_cached_responses_and_chunks(app, monkeypatch):
+    generated = []
+    generate_batch = app.generate_batch
+    def counting_generate_batch(records, *args):
+        generated.extend(records)
+        return generate_batch(records, *args)
+    monkeypatch.setattr(app, "generate_batch", counting_generate_batch)
+    client = app.app.test_client()
+    request = {"text": ARTICLE, "metrics": ["readability"], "baseline": False, "profile": "fast"}
+
+    first = client.post("/simplify", json=request).get_json()
+    chunk_count = len(generated)
+    assert chunk_count > 0
+    assert client.post("/simplify", json=request).get_json() == first
+    assert len(generated) == chunk_count
+
+    # Other metrics miss the response cache, every chunk output comes from the chunk cache
+    second = client.post("/simplify", json=dict(request, metrics=["complexity"])).get_json()
+    assert len(generated) == chunk_count
+    assert second["simplified"] == first["simplified"]
+    assert second["trace"]["cache"] == f"{chunk_count} of {chunk_count} chunks were taken from the cache."
+    assert list(second["metrics"]) == ["complexity"]
+
+def test_job_streams_sections_then_result(app):
+    client = app.app.test_client()
+    response = client.post("/jobs", json={"text": ARTICLE, "baseline": False, "profile": "fast"})
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+
+    events = client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+    job = client.get(f"/jobs/{job_id}").get_json()
+    assert job["status"] == "done"
+    sections = list(job["result"]["keywords"])
+    assert re.findall(r"^event: (\w+)$", events, re.M) == ["section"] * len(sections) + ["done"]
+    assert sorted(section["section"] for section in job["sections"]) == sorted(sections)
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/unknown/events").status_code == 404
+
+def test_metrics_route_scores_an_output(app, monkeypatch):
+    monkeypatch.setitem(app.METRICS, "bert", lambda output, baseline: 42.0)
+    client = app.app.test_client()
+
+    response = client.post("/metrics", json={"output": "The data is simple."})
+    assert response.status_code == 200
+    assert sorted(response.get_json()["metrics"]) == sorted(app.DEFAULT_METRICS)
+
+    response = client.post("/metrics", json={"output": "The data.", "baseline": "Data.", "metrics": ["bert"]})
+    assert response.get_json() == {"metrics": {"bert": 42.0}}
+    assert client.post("/metrics", json={"output": "The data.", "metrics": ["bert"]}).status_code == 400
+    assert client.post("/metrics", json={"output": "The data.", "metrics": ["unknown"]}).status_code == 400
+    assert client.post("/metrics", json={"metrics": ["readability"]}).status_code == 400
+
+def test_cached_outputs_are_keyed_on_the_model_variant(app, monkeypatch):
+    record = {"prompt": "Simplify and summarize: text", "keywords": ["text"]}
+    sections = {"Introduction": "Deep learning models predict protein structure."}
+    monkeypatch.setattr(app, "MODEL_VARIANT", "cpu-fp32")
+    keys = app.chunk_cache_key(record), app.baseline_cache_key(sections)
+    monkeypatch.setattr(app, "MODEL_VARIANT", "cpu-int8")
+    assert app.chunk_cache_key(record) != keys[0]
+    assert app.baseline_cache_key(sections) != keys[1]
+
+def test_simplify_finishes_while_baseline_workers_are_busy(app, monkeypatch):
+    monkeypatch.setattr(app, "pipeline_pool", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(app, "baseline_pool", ThreadPoolExecutor(max_workers=2))
+    release = threading.Event()
+    monkeypatch.setattr(app, "run_baseline", lambda key, sections, records, profile: release.wait(60))
+    # Long baselines of earlier requests hold every worker
+    for key in ("first", "second", "third"):
+        app.start_baseline(key, {})
+    responses = []
+    def simplify():
+        responses.append(app.app.test_client().post("/simplify", json={"text": ARTICLE, "profile": "fast"}))
+    thread = threading.Thread(target=simplify)
+    try:
+        thread.start()
+        thread.join(timeout=30)
+        assert not thread.is_alive()
+        payload = responses[0].get_json()
+        assert payload["simplified"]
+        assert payload["baseline"] is None and payload["baselineId"] in app.baseline_jobs
+    finally:
+        release.set()
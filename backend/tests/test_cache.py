@@ -0,0 +1,48 @@
+import threading
+from cache import ResultCache, make_key
+
+
+def test_make_key_is_stable_and_content_addressed():
+    key = make_key("chunk", "t5-custom", {"max_length": 256}, "Simplify and summarize: text", ["text"])
+    assert key == make_key("chunk", "t5-custom", {"max_length": 256}, "Simplify and summarize: text", ["text"])
+    assert key != make_key("chunk", "t5-custom", {"max_length": 128}, "Simplify and summarize: text", ["text"])
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache("test", max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["size"] == 2
+
+def test_entries_survive_restart_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache("responses", max_items=1, path=path)
+    cache.set("a", {"simplified": "text"})
+    cache.set("b", {"simplified": "other"})
+
+    reloaded = ResultCache("responses", max_items=1, path=path)
+    assert reloaded.get("a") == {"simplified": "text"}
+    assert reloaded.stats()["hits"] == 1
+
+def test_caches_share_one_file_across_threads(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    caches = [ResultCache(name, path=path) for name in ("responses", "chunks", "baselines")]
+    assert caches[0].db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    errors = []
+    def write(cache):
+        try:
+            for i in range(50):
+                cache.set(f"key {i}", {"value": i})
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert ResultCache("chunks", path=path).get("key 49") == {"value": 49}
@@ -0,0 +1,43 @@
+import torch
+import torch.nn.functional as F
+from cpu_inference import optimize_model, quantize_linear_layers, model_variant
+
+CPU = torch.device("cpu")
+
+
+def test_quantized_attention_projections_stay_close_to_fp32(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    with torch.inference_mode():
+        expected = model.encode(input_ids, attention_mask, importance_mask).last_hidden_state
+    quantized = quantize_linear_layers(make_tiny_model())
+    attention = quantized.encoder.block[0].layer[0].SelfAttention
+    assert "quantized" in type(attention.q).__module__
+    with torch.inference_mode():
+        plain = quantized.encode(input_ids, attention_mask).last_hidden_state
+        masked = quantized.encode(input_ids, attention_mask, importance_mask).last_hidden_state
+    similarity = F.cosine_similarity(masked.flatten(1), expected.flatten(1))
+    assert similarity.min() > 0.99
+    # The importance bias still reaches the quantized attention
+    assert not torch.allclose(plain, masked)
+
+
+def test_optimized_model_generates(make_tiny_model, make_inputs):
+    model = optimize_model(make_tiny_model(), CPU, quantize=True, compile=False)
+    input_ids, attention_mask, importance_mask = make_inputs()
+    with torch.inference_mode():
+        encoder_outputs = model.encode(input_ids, attention_mask, importance_mask)
+        output = model.generate(
+            encoder_outputs=encoder_outputs, attention_mask=attention_mask, max_length=8, do_sample=False
+        )
+    assert output.shape[0] == 2
+
+
+def test_quantization_is_skipped_off_cpu(make_tiny_model):
+    model = optimize_model(make_tiny_model(), torch.device("cuda"), quantize=True, compile=False)
+    assert type(model.encoder.block[0].layer[0].SelfAttention.q) is torch.nn.Linear
+
+def test_model_variant_names_the_quantized_cpu_model():
+    assert model_variant(CPU, quantize=True) == "cpu-int8"
+    assert model_variant(CPU, quantize=False) == "cpu-fp32"
+    assert model_variant(torch.device("cuda"), quantize=True) == "cuda-fp32"
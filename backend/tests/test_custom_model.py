@@ -0,0 +1,84 @@
+import sys
+import threading
+import torch
+
+
+def test_encode_pair_matches_separate_encodes(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    with torch.no_grad():
+        plain, masked = model.encode_pair(input_ids, attention_mask, importance_mask)
+        expected_plain = model.encode(input_ids, attention_mask).last_hidden_state
+        expected_masked = model.encode(input_ids, attention_mask, importance_mask).last_hidden_state
+    assert torch.allclose(plain.last_hidden_state, expected_plain, atol=1e-6)
+    assert torch.allclose(masked.last_hidden_state, expected_masked, atol=1e-6)
+    assert not torch.allclose(expected_plain, expected_masked)
+
+def test_importance_mask_does_not_leak_between_calls(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    with torch.no_grad():
+        before = model.encode(input_ids, attention_mask).last_hidden_state
+        model.encode(input_ids, attention_mask, importance_mask)
+        after = model.encode(input_ids, attention_mask).last_hidden_state
+    assert torch.equal(before, after)
+
+def test_concurrent_encodes_use_their_own_masks(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    masks = [importance_mask * k for k in range(4)]
+    with torch.no_grad():
+        expected = [model.encode(input_ids, attention_mask, m).last_hidden_state for m in masks]
+
+    mismatches = []
+    def worker(k):
+        with torch.no_grad():
+            for _ in range(20):
+                hidden = model.encode(input_ids, attention_mask, masks[k]).last_hidden_state
+                if not torch.allclose(hidden, expected[k], atol=1e-6):
+                    mismatches.append(k)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(len(masks))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert mismatches == []
+
+def test_fused_attention_matches_explicit_path(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    with torch.no_grad():
+        for mask in (None, importance_mask):
+            fused = model.encode(input_ids, attention_mask, mask).last_hidden_state
+            # output_attentions=True takes the explicit softmax(q @ k^T + bias) @ v path
+            explicit = model.encoder(
+                input_ids=input_ids, attention_mask=attention_mask, importance_mask=mask,
+                output_attentions=True, return_dict=True
+            )
+            assert torch.allclose(fused, explicit.last_hidden_state, atol=1e-5)
+    # The explicit weights are still returned, padded keys get no attention
+    assert explicit.attentions[0][1, :, :, 8:].abs().max() < 1e-6
+
+def test_generate_decodes_one_token_per_step_with_kv_cache(make_tiny_model, make_inputs):
+    model = make_tiny_model()
+    input_ids, attention_mask, importance_mask = make_inputs()
+    decoder_lengths = []
+    model.decoder.register_forward_pre_hook(
+        lambda module, args, kwargs: decoder_lengths.append(kwargs["input_ids"].shape[1]), with_kwargs=True
+    )
+    with torch.no_grad():
+        # generate() expands encoder_outputs in place for beam search, so each call gets its own
+        def generate(**kwargs):
+            encoder_outputs = model.encode(input_ids, attention_mask, importance_mask)
+            return model.generate(encoder_outputs=encoder_outputs, attention_mask=attention_mask, max_length=10, **kwargs)
+
+        cached = generate(min_length=10)
+        assert decoder_lengths == [1] * 9
+        assert torch.equal(cached, generate(min_length=10, use_cache=False))
+        assert torch.equal(generate(num_beams=3), generate(num_beams=3, use_cache=False))
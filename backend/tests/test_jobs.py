@@ -0,0 +1,43 @@
+import threading
+from jobs import JobManager
+
+
+def test_job_streams_sections_then_done():
+    manager = JobManager(max_workers=1)
+
+    def work(job, sections):
+        for name in sections:
+            job.emit("section", {"section": name, "text": name.lower()})
+        return {"simplified": "done"}
+
+    job = manager.submit(work, ["Intro", "Methods"])
+    messages = list(manager.stream(job, heartbeat=1))
+    assert messages[0].startswith("event: section\n")
+    assert '"section": "Methods"' in messages[1]
+    assert messages[-1].startswith("event: done\n")
+
+    state = manager.get(job.id).to_dict()
+    assert state["status"] == "done"
+    assert [s["section"] for s in state["sections"]] == ["Intro", "Methods"]
+    assert state["result"] == {"simplified": "done"}
+
+def test_job_error_is_reported():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError("boom")
+
+    job = manager.submit(work)
+    messages = list(manager.stream(job, heartbeat=1))
+    assert messages[-1].startswith("event: error\n")
+    assert manager.get(job.id).to_dict()["error"] == "boom"
+
+def test_submit_refuses_when_queue_is_full():
+    manager = JobManager(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    job = manager.submit(lambda job: release.wait(5))
+    assert manager.submit(lambda job: None) is None
+    release.set()
+    list(manager.stream(job, heartbeat=1))
+    assert manager.submit(lambda job: None) is not None
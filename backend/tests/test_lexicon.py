@@ -0,0 +1,50 @@
+import os
+import time
+import pytest
+from lexicon import Lexicon, write_lexicon, load_lexicon, lexicon_path
+from metrics_new import calculate_word_freq_score, calculate_readability
+
+
+def test_lexicon_lookups(tmp_path):
+    path = str(tmp_path / "words.lex")
+    write_lexicon(path, {"the": 1.0, "naïve": 0.25, "a": 0.5, "": 0.125})
+    lexicon = Lexicon(path)
+    assert len(lexicon) == 4
+    assert lexicon["naïve"] == 0.25
+    assert lexicon.get("a") == 0.5
+    assert "" in lexicon
+    assert "zebra" not in lexicon
+    assert lexicon.get("zebra") is None
+    with pytest.raises(KeyError):
+        lexicon["zebra"]
+
+def test_lexicon_replaces_dict_and_set_in_metrics(tmp_path):
+    frequencies = {"science": 1.0, "is": 0.5}
+    path = str(tmp_path / "freq.lex")
+    write_lexicon(path, frequencies)
+    text = "Science is fun, science!"
+    assert calculate_word_freq_score(text, Lexicon(path)) == calculate_word_freq_score(text, frequencies)
+
+    common = {"science", "is"}
+    write_lexicon(path, dict.fromkeys(common, 1.0))
+    assert calculate_readability(text, Lexicon(path)) == calculate_readability(text, common)
+
+def test_load_lexicon_falls_back_to_missing_or_stale_file(tmp_path):
+    source = str(tmp_path / "words.txt")
+    with open(source, "w") as f:
+        f.write("the\n")
+    parsed = lambda path: {"parsed"}
+    assert load_lexicon(source, parsed) == {"parsed"}
+
+    write_lexicon(lexicon_path(source), {"the": 1.0})
+    assert isinstance(load_lexicon(source, parsed), Lexicon)
+
+    stale = time.time() - 60
+    os.utime(lexicon_path(source), (stale, stale))
+    assert load_lexicon(source, parsed) == {"parsed"}
+
+def test_invalid_lexicon_file_is_rejected(tmp_path):
+    path = tmp_path / "bad.lex"
+    path.write_bytes(b"not a lexicon at all")
+    with pytest.raises(ValueError):
+        Lexicon(str(path))
@@ -3,7 +3,14 @@ from metrics_new import (
     calculate_word_freq_score,
     calculate_complexity,
     calculate_readability,
+    calculate_complexity_many,
+    calculate_readability_many,
+    TextStats,
     calculate_embedding_similarity,
+    calculate_embedding_similarity_many,
+    embedding_cache,
+    calculate_bert_score_many,
+    get_bert_scorer,
     load_common_words,
 
 )
@@ -27,6 +34,59 @@ def test_calculate_readability_bounds():
     score = calculate_readability("Science is great!", words)
     assert 0 <= score <= 100
 
+def test_text_stats_tokenizes_once():
+    stats = TextStats("Science is evolving rapidly. It is great!  ")
+    assert stats.words == ["Science", "is", "evolving", "rapidly.", "It", "is", "great!"]
+    assert stats.total_sentences == 2
+    assert len(stats.syllables) == 7
+    assert stats.complex_word_ratio == 2 / 7
+
+def test_scores_of_many_documents_match_single_calls():
+    words = {"science", "is", "great"}
+    texts = ["Science is evolving rapidly.", "", "Science is great! Really great.", "..."]
+    assert calculate_complexity_many(texts) == [calculate_complexity(text) for text in texts]
+    assert calculate_readability_many(texts, words) == [calculate_readability(text, words) for text in texts]
+
 def test_embedding_similarity_between_similar_sentences():
     sim = calculate_embedding_similarity("AI is powerful.", "AI is strong.")
     assert 0 <= sim <= 100
+
+def test_embedding_similarity_many_batches_and_caches_embeddings(monkeypatch):
+    import numpy as np
+    from model_registry import registry
+
+    class FakeSBERT:
+        calls = []
+
+        def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings):
+            self.calls.append(list(texts))
+            vectors = np.array([[len(text), text.count("a") + 1.0] for text in texts], dtype=np.float32)
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    monkeypatch.setitem(registry.resources, "sbert", FakeSBERT())
+    monkeypatch.setattr(embedding_cache, "items", type(embedding_cache.items)())
+    generated = ["a cat", "banana split", "a cat"]
+    references = ["the cat", "bananas", "a dog"]
+
+    scores = calculate_embedding_similarity_many(generated, references)
+    assert FakeSBERT.calls == [["a cat", "banana split", "the cat", "bananas", "a dog"]]
+    gen, ref = np.array([5.0, 3.0]), np.array([7.0, 2.0])
+    cosine = gen @ ref / (np.linalg.norm(gen) * np.linalg.norm(ref))
+    assert np.isclose(scores[0], cosine * 100)
+
+    assert calculate_embedding_similarity("a cat", "a dog") == scores[2]
+    assert len(FakeSBERT.calls) == 1
+
+def test_bert_score_many_scores_each_pair_with_shared_scorer():
+    scores = calculate_bert_score_many(
+        ["AI is powerful.", "The cat sat on the mat."],
+        ["AI is strong.", "A cat was sitting on a mat."]
+    )
+    assert len(scores) == 2
+    assert all(0 <= s <= 100 for s in scores)
+    assert get_bert_scorer() is get_bert_scorer()
+
+def test_spacy_is_not_part_of_readiness():
+    from model_registry import registry
+    assert registry.warm["spacy"] is False
+    assert registry.warm["sbert"] is True
@@ -0,0 +1,81 @@
+import threading
+import time
+from model_registry import ModelRegistry
+
+
+def test_resource_is_loaded_once_on_first_use():
+    registry = ModelRegistry()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    registry.register("model", loader)
+    assert calls == [] and registry.status() == {"model": "pending"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert registry.status() == {"model": "loaded"}
+
+def test_ready_only_counts_warm_resources():
+    registry = ModelRegistry()
+    registry.register("model", lambda: "model")
+    registry.register("scorer", lambda: "scorer", warm=False)
+    assert not registry.ready()
+
+    registry.warm_up(background=False)
+    assert registry.ready()
+    assert registry.status() == {"model": "loaded", "scorer": "pending"}
+
+def test_failed_load_is_reported_and_retried():
+    registry = ModelRegistry()
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("missing weights")
+        return "model"
+
+    registry.register("model", loader)
+    registry.warm_up(background=False)
+    assert registry.status() == {"model": "error"}
+    assert registry.get("model") == "model"
+    assert registry.ready()
+
+def test_identical_tokenizers_are_shared(monkeypatch):
+    import transformers
+
+    class FakeBackend:
+        def __init__(self, vocab):
+            self.vocab = vocab
+
+        def to_str(self):
+            return self.vocab
+
+    class FakeTokenizer:
+        def __init__(self, vocab):
+            self.backend_tokenizer = FakeBackend(vocab)
+
+    loads = []
+    def from_pretrained(path):
+        loads.append(path)
+        return FakeTokenizer("t5-vocab" if path != "other" else "other-vocab")
+    monkeypatch.setattr(transformers.T5TokenizerFast, "from_pretrained", from_pretrained)
+
+    registry = ModelRegistry()
+    registry.register_tokenizer("model", "./MODEL/t5-custom")
+    registry.register_tokenizer("baseline", "t5-small")
+    registry.register_tokenizer("baseline_again", "t5-small")
+    registry.register_tokenizer("other", "other")
+    assert registry.get("model") is registry.get("baseline") is registry.get("baseline_again")
+    assert registry.get("other") is not registry.get("model")
+    assert loads == ["./MODEL/t5-custom", "t5-small", "other"]
@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pipeline import Producer, StageTimer
+
+
+def test_producer_keeps_order_and_drains_ready_results():
+    pool = ThreadPoolExecutor(max_workers=1)
+    producer = Producer(pool, lambda x: x * 10, [1, 2, 3], maxsize=4)
+    producer.future.result(timeout=5)  # every result is queued, the next call takes them all
+    assert producer.next_ready() == [(1, 10), (2, 20), (3, 30)]
+    assert producer.next_ready() == []
+
+def test_producer_stays_at_most_maxsize_ahead():
+    pool = ThreadPoolExecutor(max_workers=1)
+    started = []
+    def work(x):
+        started.append(x)
+        return x
+    producer = Producer(pool, work, range(10), maxsize=2)
+    time.sleep(0.3)
+    # 2 results queued, the third one waits for room
+    assert started == [0, 1, 2]
+    results = []
+    while True:
+        ready = producer.next_ready()
+        if not ready:
+            break
+        results.extend(result for _, result in ready)
+    assert results == list(range(10))
+
+def test_producer_error_is_raised_in_consumer():
+    pool = ThreadPoolExecutor(max_workers=1)
+    def work(x):
+        if x == 2:
+            raise ValueError("boom")
+        return x
+    producer = Producer(pool, work, [1, 2, 3], maxsize=1)
+    assert producer.next_ready() == [(1, 1)]
+    with pytest.raises(ValueError, match="boom"):
+        producer.next_ready()
+
+def test_closed_producer_stops_waiting_for_room():
+    pool = ThreadPoolExecutor(max_workers=1)
+    producer = Producer(pool, lambda x: x, range(100), maxsize=1)
+    producer.next_ready()
+    producer.close()
+    producer.future.result(timeout=5)
+
+def test_stage_timer_sums_across_threads():
+    timer = StageTimer()
+    def work():
+        with timer.stage("keywords"):
+            time.sleep(0.05)
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    timer.add("generation", 1.23456)
+    timings = timer.as_dict()
+    assert timings["keywords"] >= 0.15
+    assert timings["generation"] == 1.235
@@ -0,0 +1,46 @@
+import io
+import pytest
+from text_cleaning import clean_text, clean_paragraphs, iter_paragraphs
+
+# Outputs of the former sequential re.sub implementation of utils.clean_text
+LEGACY_OUTPUTS = [
+    ("Deep networks @xcite achieve $O(n^2)$ accuracy~@xmath12 as in \\cite{lecun} and \\ref{fig:1}.",
+     "Deep networks achieve accuracy as in and ."),
+    ("Transformers (Vaswani et al., 2017) were popularised by Devlin et al. and Brown and Mann (2020) scaled them.",
+     "Transformers were popularised and scaled them."),
+    ("Several tasks (e.g., translation) improved (April 2021), see (Table 3) and Fig. 2a for details (2019).",
+     "Several tasks improved , see and for details ."),
+    ("Contact jane.doe@uni.edu or visit https://example.org/paper?id=3 and www.lab.com [12], [1, 2, 3].",
+     "Contact or visit and , ."),
+    ("The proposed method by Smith (2019) works {} [] () well.\n\nSecond   paragraph\twith   spaces.",
+     "The proposed method works well. Second paragraph with spaces."),
+    ("Results are robust (cf. prior work) across datasets. Copyright 2021 the authors. Hidden text.",
+     "Results are robust across datasets."),
+    ("Our approach generalises.\nFunding: this work was supported by a grant.",
+     "Our approach generalises."),
+    ("It was shown by (Smith et al., 2019) Transformers work well.",
+     "It was shown work well."),
+    ("Gains are large ( (see above) 2019 ) here, as in \\cite{a $b} and $c$ or [1 http://x.org ,2] too.",
+     "Gains are large here, as in \\cite{a c$ or too."),
+]
+
+@pytest.mark.parametrize("text, expected", LEGACY_OUTPUTS)
+def test_clean_text_matches_legacy_output(text, expected):
+    assert clean_text(text) == expected
+
+def test_clean_text_tilde_replacement():
+    assert clean_text("a~b") == "a b"
+    assert clean_text("a~b", tilde="") == "ab"
+
+def test_clean_paragraphs_streams_and_stops_at_marker():
+    document = io.StringIO(
+        "First paragraph (Smith et al., 2019)\nstill first.\n"
+        "\n"
+        "Second [3] paragraph.\n"
+        "\n\n"
+        "Notes: dropped.\n"
+        "\n"
+        "Never reached.\n"
+    )
+    paragraphs = list(clean_paragraphs(iter_paragraphs(document)))
+    assert paragraphs == ["First paragraph still first.", "Second paragraph."]
@@ -1,8 +1,9 @@
 
 import pytest
-from utils import clean_text, split_sections, split_into_chunks, build_prompt, postprocess_summary, build_importance_mask
+from utils import clean_text, split_sections, find_sections, split_tei_sections, split_into_chunks, chunk_token_ids, build_prompt_ids, build_prompt, postprocess_summary, build_importance_mask, bucket_by_length, extract_keywords, extract_keywords_many, build_keyword_indexes
 from transformers import T5Tokenizer
 import torch
+from model_registry import registry
 
 def test_clean_text_removes_latex_and_urls():
     text = "Here is a formula: $x^2$ and a URL: https://example.com"
@@ -14,12 +15,86 @@ def test_split_sections_basic():
     result = split_sections(text)
     assert "Intro" in result and "Methods" in result
 
+def test_split_sections_keeps_repeated_titles():
+    text = ("Results\nThe first results are shown here.\n"
+            "Methods\nWe used several known methods.\n"
+            "Results\nThe second results differ.")
+    result = split_sections(text)
+    assert list(result) == ["Results", "Methods", "Results (2)"]
+    assert result["Results (2)"] == "The second results differ."
+
+def test_find_sections_returns_offsets():
+    text = "Intro\r\nThis is intro.\r\nMethods\r\nThis is methods."
+    spans = find_sections(text)
+    assert [title for title, _, _ in spans] == ["Intro", "Methods"]
+    assert [text[start:end].strip() for _, start, end in spans] == ["This is intro.", "This is methods."]
+
+def test_split_tei_sections_uses_div_heads():
+    tei = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>
+<div><head>Introduction</head><p>We study   <ref>[1]</ref> things.</p><p>More.</p></div>
+<div><p>Continued.</p></div>
+<div type="figure"><head>Figure 1</head><p>Caption.</p></div>
+<div><head>Introduction</head><p>Again.</p></div>
+</body></text></TEI>"""
+    result = split_tei_sections(tei)
+    assert result == {"Introduction": "We study [1] things.\nMore.\nContinued.", "Introduction (2)": "Again."}
+    with pytest.raises(ValueError):
+        split_tei_sections("<TEI>")
+
+def test_split_tei_sections_refuses_entity_declarations():
+    tei = """<?xml version="1.0"?>
+<!DOCTYPE TEI [<!ENTITY a "aaaaaaaaaa"><!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body><div><head>Intro</head><p>&b;</p></div></body></text></TEI>"""
+    with pytest.raises(ValueError, match="Invalid TEI XML"):
+        split_tei_sections(tei)
+
 def test_split_into_chunks_output_type():
     text = " ".join(["token"] * 600)
     chunks = split_into_chunks(text, chunk_size=100, overlap=10)
     assert isinstance(chunks, list)
     assert all(isinstance(c, str) for c in chunks)
 
+class WordTokenizer:
+    """
+    One token per word, so chunking tests run without downloading a tokenizer.
+    """
+    eos_token_id = 1
+
+    def __init__(self):
+        self.vocab = {}
+
+    def __call__(self, texts, add_special_tokens=True):
+        single = isinstance(texts, str)
+        ids = [[self.vocab.setdefault(word, len(self.vocab) + 2) for word in text.split()]
+               for text in ([texts] if single else texts)]
+        return {"input_ids": ids[0] if single else ids}
+
+    def decode(self, ids):
+        words = {i: word for word, i in self.vocab.items()}
+        return " ".join(words[i] for i in ids)
+
+def test_chunk_token_ids_cuts_on_sentences_with_overlap():
+    tokenizer = WordTokenizer()
+    text = "One two three. Four five. Six seven eight nine. Ten."
+    chunks = chunk_token_ids(text, tokenizer, budget=6, overlap=2)
+    assert [chunk_text for chunk_text, _ in chunks] == [
+        "One two three. Four five.", "Four five. Six seven eight nine.", "Ten."
+    ]
+    for chunk_text, ids in chunks:
+        assert ids == tokenizer(chunk_text, add_special_tokens=False)["input_ids"]
+
+def test_build_prompt_ids_drops_keywords_that_do_not_fit():
+    tokenizer = WordTokenizer()
+    chunk_ids = [tokenizer("word " * 10, add_special_tokens=False)["input_ids"]]
+    # 3 prefix + 10 chunk + 2 "Focus on:" + EOS leave 3 tokens for "alpha beta, gamma delta"
+    ids_list, keywords_list = build_prompt_ids(chunk_ids, [["alpha beta", "gamma delta"]], tokenizer, max_length=19)
+    assert keywords_list == [["alpha beta"]]
+    assert len(ids_list[0]) <= 19
+    assert ids_list[0][-1] == tokenizer.eos_token_id
+    prompt = build_prompt("word " * 10, ["alpha beta"])
+    assert ids_list[0][:-1] == tokenizer(prompt, add_special_tokens=False)["input_ids"]
+
 def test_build_prompt_contains_keywords():
     text = "Sample section text"
     keywords = ["AI", "robotics"]
@@ -37,3 +112,53 @@ def test_build_importance_mask_shape():
     input_ids = tokenizer(text, return_tensors="pt").input_ids
     mask = build_importance_mask(input_ids, ["AI", "science"], tokenizer)
     assert mask.shape == input_ids.shape
+
+def legacy_importance_mask(input_ids, keywords, tokenizer):
+    flat_keywords = set(word.lower() for phrase in keywords for word in phrase.split())
+    return torch.tensor([
+        [2.6 if tok.lower().replace('▁', '').strip() in flat_keywords else 0.0
+         for tok in tokenizer.convert_ids_to_tokens(sequence)]
+        for sequence in input_ids
+    ], dtype=torch.float32)
+
+def test_build_importance_mask_keeps_whole_token_matches():
+    tokenizer = T5Tokenizer.from_pretrained("t5-small")
+    texts = ["AI is revolutionizing science.", "Rainfall over tropical regions is changing fast."]
+    input_ids = tokenizer(texts, return_tensors="pt", padding=True).input_ids
+    keywords = ["ai", "science", "tropical regions"]
+    mask = build_importance_mask(input_ids, keywords, tokenizer)
+    legacy = legacy_importance_mask(input_ids, keywords, tokenizer)
+    assert torch.equal(mask[legacy > 0], legacy[legacy > 0])
+
+def test_build_importance_mask_marks_multi_token_keywords_per_row():
+    tokenizer = T5Tokenizer.from_pretrained("t5-small")
+    texts = ["Photosynthesis drives growth.", "Photosynthesis drives growth."]
+    input_ids = tokenizer(texts, return_tensors="pt").input_ids
+    span = tokenizer("Photosynthesis", add_special_tokens=False).input_ids
+    assert len(span) > 1
+    mask = build_importance_mask(input_ids, [["photosynthesis"], []], tokenizer)
+    assert (mask[0, :len(span)] == 2.6).all()
+    assert (mask[1] == 0).all()
+
+def test_bucket_by_length_groups_similar_lengths():
+    lengths = [30, 5, 512, 7, 480, 31]
+    batches = bucket_by_length(lengths, batch_size=2)
+    assert batches == [[1, 3], [0, 5], [4, 2]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+
+def test_extract_keywords_many_matches_extract_keywords(hash_keybert):
+    texts = [
+        "Neural networks learn representations of protein structure from sequence data.",
+        "The climate model predicts rainfall changes across tropical regions and coastal cities.",
+        "the and of",
+        "",
+    ]
+    assert extract_keywords_many(texts) == [extract_keywords(text) for text in texts]
+
+def test_keyword_index_matches_extract_keywords_on_chunks(hash_keybert):
+    section = ("Graph neural networks predict molecular properties. "
+               "Message passing aggregates features of neighbouring atoms. "
+               "Benchmarks show gains on solubility and toxicity datasets.")
+    chunks = [section[:52], section[52:]]
+    indexes, _ = build_keyword_indexes([section])
+    assert indexes[0].keywords(chunks) == [extract_keywords(chunk) for chunk in chunks]
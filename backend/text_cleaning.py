@@ -0,0 +1,146 @@
+import re
+
+# === PRECOMPILED PATTERNS === #
+# clean_text used to run ~20 re.sub passes in sequence. Patterns share one alternation
+# only when no removal in the group can create a new match for another pattern of the
+# group, and passes keep the original order. A removal that can expose a new match,
+# e.g. "shown by (Smith, 2019) Transformers" -> "shown by Transformers", keeps its own
+# pass, so outputs are the same as the sequential version.
+# Patterns start with a literal or a character class rather than \b, which lets the regex
+# engine skip straight to candidate positions: `b(?<!\wb)` is `\bb` written that way.
+
+# LaTeX-style markers: @xmath12, then @xcite and $...$, then \cite{...} / \ref{...} / \label{...}
+# ("@x@xmath1cite" exposes @xcite; a '$' inside \cite{...} pairs with the next '$' first)
+XMATH_RE = re.compile(r'@xmath\d+')
+LATEX_RE = re.compile(r'@xcite|\$.*?\$')
+LATEX_COMMAND_RE = re.compile(r'\\(?:cite|ref|label)\{[^}]*\}')
+
+# (Author et al., 2019)
+CITATION_RE = re.compile(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(?:et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)')
+
+# "by Author et al." - separate pass: removing a citation can join "by" and the next name
+BY_AUTHOR_RE = re.compile(r'b(?<!\wb)y\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?')
+
+# Author et al. (2019) - separate pass: removing "by Author" above can expose it
+AUTHOR_YEAR_RE = re.compile(r'[A-Z](?<!\w[A-Z])[a-zA-Z\-]+(?:\s+(?:et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)')
+
+# (i.e., ...), (April 2022), (2020), (Table 3) - one pass each, in this order: removing one
+# can close the parentheses around the next, e.g. "( (see above) 2019 )" -> "(  2019 )"
+PARENTHETICAL_RES = [
+    re.compile(r'\((?i:i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)'),
+    re.compile(r'\((?i:\s*(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*)\)'),
+    re.compile(r'\(\s*\d{4}\s*\)'),
+    re.compile(r'\((?i:Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)'),
+]
+
+# Bare mentions like Fig. 2 - separate pass: a removed parenthetical can expose a word start
+FIGURE_RE = re.compile(r'[TtFf](?<!\w[TtFf])(?i:(?<=t)ab(?:le|\.)?|(?<=f)ig(?:ure|\.)?)\s*\d+[a-zA-Z]?')
+
+# Emails, only run on whitespace-delimited words containing '@' (see _remove_emails)
+EMAIL_RE = re.compile(r'\b\S+@\S+\.\S+\b')
+
+# URLs
+URL_RE = re.compile(r'https?://\S+|www\.\S+')
+
+# Citations like [12], [f7], [1, 2, 3] - separate pass: removing a URL can expose "[1 ,2]"
+BRACKET_CITATION_RE = re.compile(r'\[\s*[\w\d, ]+\]')
+
+# Everything from the first copyright / funding / notes marker on is dropped
+# (same as \b(?:copyright|©|funding|notes?)\b, case-insensitive)
+TRUNCATE_RE = re.compile(r'(?i)[cfn©](?<!\w[cfn])(?:(?<=c)opyright|(?<=f)unding|(?<=n)otes?|(?<=\w©))\b')
+
+EMPTY_BRACKETS_RE = re.compile(r'\{\}|\[\]|\(\)')
+
+
+def _remove_emails(text):
+    """
+    EMAIL_RE.sub('', text). Every match lies inside one run of non-space characters,
+    so the pattern only has to run on the runs containing '@' instead of the whole text.
+    """
+    at = text.find('@')
+    if at == -1:
+        return text
+    pieces = []
+    last = 0
+    while at != -1:
+        start = at
+        while start > last and not text[start - 1].isspace():
+            start -= 1
+        end = at + 1
+        while end < len(text) and not text[end].isspace():
+            end += 1
+        pieces.append(text[last:start])
+        pieces.append(EMAIL_RE.sub('', text[start:end]))
+        last = end
+        at = text.find('@', end)
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+def _clean(text, tilde=' '):
+    """
+    Run all cleaning passes over one piece of text.
+    Returns: (cleaned_text, truncated) - truncated is True if a copyright/funding/notes marker was found
+    """
+    # None of the LaTeX patterns tell '~' from ' ', so it can be replaced first
+    text = text.replace('~', tilde)
+    text = XMATH_RE.sub('', text)
+    text = LATEX_RE.sub('', text)
+    text = LATEX_COMMAND_RE.sub('', text)
+    text = CITATION_RE.sub('', text)
+    text = BY_AUTHOR_RE.sub('', text)
+    text = AUTHOR_YEAR_RE.sub('', text)
+    for pattern in PARENTHETICAL_RES:
+        text = pattern.sub('', text)
+    text = FIGURE_RE.sub('', text)
+    text = _remove_emails(text)
+    text = URL_RE.sub('', text)
+    text = BRACKET_CITATION_RE.sub('', text)
+
+    marker = TRUNCATE_RE.search(text)
+    if marker:
+        text = text[:marker.start()]
+
+    text = EMPTY_BRACKETS_RE.sub('', text)
+    # Same as re.sub(r'\s+', ' ', text).strip()
+    return ' '.join(text.split()), marker is not None
+
+
+def clean_text(text, tilde=' '):
+    """
+    Clean scientific text thoroughly.
+    tilde: replacement for LaTeX non-breaking spaces ('~')
+    """
+    return _clean(text, tilde)[0]
+
+
+def iter_paragraphs(lines):
+    """
+    Group lines (e.g. an open file) into paragraphs separated by blank lines.
+    """
+    paragraph = []
+    for line in lines:
+        if line.strip():
+            paragraph.append(line)
+        elif paragraph:
+            yield ''.join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield ''.join(paragraph)
+
+
+def clean_paragraphs(paragraphs, tilde=' '):
+    """
+    Streaming clean_text: clean paragraphs one at a time, so a long document never has
+    to be held (or copied by every pass) as a single string.
+    Stops at the first copyright/funding/notes marker, like clean_text.
+    A marker split by a paragraph break (e.g. a citation whose parentheses span it)
+    is kept, where clean_text on the whole document would remove it.
+    Yields: cleaned, non-empty paragraphs
+    """
+    for paragraph in paragraphs:
+        text, truncated = _clean(paragraph, tilde)
+        if text:
+            yield text
+        if truncated:
+            return
@@ -1,99 +1,125 @@
 import re
+import functools
+from defusedxml import DefusedXmlException, ElementTree
 from keybert import KeyBERT
-from transformers import T5Tokenizer
+from keybert._mmr import mmr
+from sklearn.feature_extraction.text import CountVectorizer
 import torch
+from model_registry import registry
+from text_cleaning import clean_text
 
-# === INITIALIZE ONCE ===
-kw_model = KeyBERT()
-tokenizer = T5Tokenizer.from_pretrained("Falconsai/text_summarization")
+# === REGISTER ONCE, LOADED ON FIRST USE ===
+registry.register("keybert", KeyBERT)
+# Only used by split_into_chunks; the hot path chunks with the model tokenizer
+registry.register_tokenizer("chunk_tokenizer", "Falconsai/text_summarization", warm=False)
 
-def clean_text(text):
-    """
-    Clean scientific text thoroughly.
-    """
-    # Remove LaTeX-style markers
-    text = re.sub(r'@xmath\d+', '', text)
-    text = re.sub(r'@xcite', '', text)
-    text = re.sub(r'\$.*?\$', '', text)
-    text = re.sub(r'\\(cite|ref|label)\{[^}]*\}', '', text)
-    text = re.sub(r'~', ' ', text)
-
-    # Remove (Author et al., 2019) and similar
-    text = re.sub(r'\(\s*[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?,?\s*\d{4}\s*\)', '', text)
-
-    # Remove by Author et al.
-    text = re.sub(r'\bby\s+[A-Z][a-zA-Z\-]+(?:\s+et al\.)?', '', text)
-
-    # Remove Author et al. (2019) and variations
-    text = re.sub(r'\b[A-Z][a-zA-Z\-]+(?:\s+(et al\.|and\s+[A-Z][a-zA-Z\-]+))?\s*\(\s*\d{4}\s*\)', '', text)
-
-    # Remove (i.e., ...), (e.g., ...), etc.
-    text = re.sub(r'\((i\.e\.|e\.g\.|see|cf\.|vs\.|respectively)[^)]*\)', '', text, flags=re.IGNORECASE)
-
-    # Remove parenthesized dates and content (e.g., (April 2022), (2020))
-    text = re.sub(r'\(\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\(\s*\d{4}\s*\)', '', text)
-
-    # Remove figure/table mentions like (Table 3), (Fig. 2)
-    text = re.sub(r'\((Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?\)', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b(Table|Tab\.?|Figure|Fig\.?)\s*\d+[a-zA-Z]?', '', text, flags=re.IGNORECASE)
-
-    # Remove emails and URLs
-    text = re.sub(r'\b\S+@\S+\.\S+\b', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-
-    # Remove citations like [12], [f7], [1, 2, 3]
-    text = re.sub(r'\[\s*[\w\d, ]+\]', '', text)
+# Header lines: short numbered/plain titles ("2.1 Results") or all-caps lines
+HEADER_RE = re.compile(r'^([0-9]+(\.[0-9]+)?\s)?[A-Za-z ]+$')
 
-    # Remove copyright and everything after
-    text = re.split(r'(?i)\b(copyright|©)\b', text)[0]
+def is_section_header(line):
+    line = line.strip()
+    return len(line.split()) <= 5 and bool(HEADER_RE.match(line) or line.isupper())
 
-    # Remove funding and notes sections
-    text = re.split(r'(?i)\b(funding|notes?)\b', text)[0]
+def find_sections(text):
+    """
+    Locate section headers (titles, all-caps, or short lines) in one pass over the text.
+    Returns: ordered list of (title, start, end) spans, text[start:end] being the section body
+    (the lines after the header, up to the next header). Repeated titles keep one span each.
+    Empty list if no header was found.
+    """
+    headers = []
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        if is_section_header(line):
+            headers.append((line.strip(), pos, pos + len(line)))
+        pos += len(line)
 
-    # Remove empty brackets and normalize spaces
-    text = re.sub(r'\{\}|\[\]|\(\)', '', text)
-    text = re.sub(r'\s+', ' ', text)
+    spans = []
+    for i, (title, _, body_start) in enumerate(headers):
+        end = headers[i + 1][1] if i + 1 < len(headers) else len(text)
+        spans.append((title, body_start, end))
+    return spans
 
-    return text.strip()
+def unique_titles(titles):
+    """
+    Make repeated titles distinct: ["Results", "Results"] -> ["Results", "Results (2)"]
+    """
+    seen = set(titles)
+    counts = {}
+    unique = []
+    for title in titles:
+        counts[title] = counts.get(title, 0) + 1
+        name = title
+        if counts[title] > 1:
+            n = counts[title]
+            while f"{title} ({n})" in seen:
+                n += 1
+            name = f"{title} ({n})"
+            seen.add(name)
+        unique.append(name)
+    return unique
 
 def split_sections(text):
     """
     Split article into sections by common scientific headers (titles, all-caps, or short lines).
-    Returns: dict {section_title: section_text}
+    Returns: dict {section_title: section_text}, in text order; repeated titles become "Title (2)", ...
     """
-    lines = text.splitlines()
-    section_positions = {}
-    current_pos = 0
+    spans = find_sections(text)
+    if not spans:
+        return {"Full Text": text}
 
-    for line in lines:
-        line_clean = line.strip()
- 
-        if (len(line_clean.split()) <= 5 and 
-            (re.match(r'^([0-9]+(\.[0-9]+)?\s)?[A-Za-z ]+$', line_clean) or line_clean.isupper())):
-            section_positions[line_clean] = current_pos
-        current_pos += len(line) + 1
+    titles = unique_titles([title for title, _, _ in spans])
+    return {title: text[start:end].strip() for title, (_, start, end) in zip(titles, spans)}
 
-    if not section_positions:
-        return {"Full Text": text}
+TEI_NS = "{http://www.tei-c.org/ns/1.0}"
+SKIPPED_TEI_DIVS = ('references', 'bibliography', 'figure', 'table')
 
-    sorted_sections = sorted(section_positions.items(), key=lambda x: x[1])
-    sections = {}
-    for i, (section, start_idx) in enumerate(sorted_sections):
-        end_idx = sorted_sections[i + 1][1] if i + 1 < len(sorted_sections) else len(text)
-        content = text[start_idx:end_idx].strip()
-        lines_in_section = content.splitlines()
-        content = "\n".join(lines_in_section[1:]).strip() 
-        sections[section] = content
+def split_tei_sections(xml):
+    """
+    Split a GROBID TEI document (the /extract-pdf output) by its <div>/<head> structure
+    instead of guessing headers from plain text. Same rules as the frontend's parseTeiXml:
+    reference/figure/table divs are skipped and paragraphs are joined with newlines.
+    Paragraphs of an untitled <div> are appended to the previous section.
+    The XML comes from requests, so it is parsed with defusedxml: entity declarations
+    (e.g. "billion laughs" expansion) and external references are refused.
+    Returns: dict {section_title: section_text}, like split_sections
+    Raises: ValueError if the XML is invalid, declares entities or has no text in its <body>
+    """
+    try:
+        root = ElementTree.fromstring(xml)
+    except (ElementTree.ParseError, DefusedXmlException) as e:
+        raise ValueError(f"Invalid TEI XML: {e}")
+    body = root.find(f".//{TEI_NS}body")
+    if body is None:
+        raise ValueError("No <body> found in TEI")
 
-    return sections
+    titles = []
+    texts = []
+    for div in body.iter(f"{TEI_NS}div"):
+        if div.get("type", "").lower() in SKIPPED_TEI_DIVS:
+            continue
+        head = div.find(f".//{TEI_NS}head")
+        title = " ".join("".join(head.itertext()).split()) if head is not None else ""
+        paragraphs = [" ".join("".join(p.itertext()).split()) for p in div.iter(f"{TEI_NS}p")]
+        paragraphs = "\n".join(p for p in paragraphs if p)
+        if not paragraphs:
+            continue
+        if title or not titles:
+            titles.append(title or "Full Text")
+            texts.append(paragraphs)
+        else:
+            texts[-1] += "\n" + paragraphs
+
+    if not titles:
+        raise ValueError("No text found in TEI <body>")
+    return dict(zip(unique_titles(titles), texts))
 
 def extract_keywords(text, n=10):
     """
     Extract top-N keywords/phrases using KeyBERT.
     Returns: list of keywords
     """
-    keywords = kw_model.extract_keywords(
+    keywords = registry.get("keybert").extract_keywords(
         text,
         keyphrase_ngram_range=(1, 2),
         stop_words='english',
@@ -103,38 +129,302 @@ def extract_keywords(text, n=10):
     )
     return [kw[0] for kw in keywords]
 
+# Same KeyBERT settings as extract_keywords (which keeps KeyBERT's default top_n of 5)
+KEYPHRASE_NGRAM_RANGE = (1, 2)
+KEYWORD_DIVERSITY = 0.7
+KEYWORD_TOP_N = 5
+
+def embed_texts(texts):
+    """
+    Embed texts with the KeyBERT sentence-transformer, in one batch.
+    Returns: np.ndarray [len(texts), dim]
+    """
+    return registry.get("keybert").model.embed(list(texts))
+
+class KeywordIndex:
+    """
+    Candidate keyphrases of one section with their embeddings, computed once.
+    Keywords of the section, or of any chunk of it, are picked (with MMR, like extract_keywords)
+    among the candidates that the text contains, reusing the cached candidate embeddings.
+    """
+
+    def __init__(self, vectorizer=None, embeddings=None):
+        self.vectorizer = vectorizer
+        self.embeddings = embeddings
+        self.candidates = vectorizer.get_feature_names_out() if vectorizer is not None else []
+
+    def keywords(self, texts, doc_embeddings=None, top_n=KEYWORD_TOP_N):
+        """
+        Keywords of each text. Only the texts are embedded, unless doc_embeddings is given.
+        Returns: list of keyword lists, one per text
+        """
+        if self.vectorizer is None:
+            return [[] for _ in texts]
+        if doc_embeddings is None:
+            doc_embeddings = embed_texts(texts)
+
+        counts = self.vectorizer.transform(texts)
+        results = []
+        for i in range(len(texts)):
+            candidate_indices = counts[i].nonzero()[1]
+            if len(candidate_indices) == 0:
+                results.append([])
+                continue
+            keywords = mmr(
+                doc_embeddings[i].reshape(1, -1),
+                self.embeddings[candidate_indices],
+                [self.candidates[j] for j in candidate_indices],
+                top_n,
+                KEYWORD_DIVERSITY,
+            )
+            results.append([kw[0] for kw in keywords])
+        return results
+
+def build_keyword_indexes(texts):
+    """
+    Build a KeywordIndex per section and extract the keywords of each section.
+    All sections and all their candidate keyphrases go through the embedder in a single batch.
+    Returns: (indexes, keywords), both aligned with texts
+    """
+    vectorizers = []
+    candidates = {}
+    for text in texts:
+        try:
+            vectorizer = CountVectorizer(ngram_range=KEYPHRASE_NGRAM_RANGE, stop_words='english').fit([text])
+        except ValueError:
+            # No candidate keyphrase at all (empty text or stop words only)
+            vectorizer = None
+        vectorizers.append(vectorizer)
+        if vectorizer is not None:
+            for candidate in vectorizer.get_feature_names_out():
+                candidates.setdefault(candidate, len(candidates))
+
+    if not texts:
+        return [], []
+    embeddings = embed_texts(list(texts) + list(candidates))
+    doc_embeddings = embeddings[:len(texts)]
+    candidate_embeddings = embeddings[len(texts):]
+
+    indexes = []
+    keywords = []
+    for i, vectorizer in enumerate(vectorizers):
+        if vectorizer is None:
+            index = KeywordIndex()
+        else:
+            rows = [candidates[c] for c in vectorizer.get_feature_names_out()]
+            index = KeywordIndex(vectorizer, candidate_embeddings[rows])
+        indexes.append(index)
+        keywords.append(index.keywords([texts[i]], doc_embeddings[i:i + 1])[0])
+    return indexes, keywords
+
+def extract_keywords_many(texts):
+    """
+    Batched extract_keywords: same keywords, one embedding pass for all texts.
+    Returns: list of keyword lists
+    """
+    return build_keyword_indexes(texts)[1]
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Prompt layout shared with build_prompt: "Simplify and summarize: {chunk}\nFocus on: {keywords}"
+PROMPT_PREFIX = "Simplify and summarize:"
+PROMPT_FOCUS = "Focus on:"
+# Tokens kept free after each chunk for the keyword list
+KEYWORD_TOKEN_BUDGET = 48
+
+def sentence_spans(text):
+    """
+    Returns: list of (start, end) offsets of the sentences of text
+    """
+    spans = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return [(start, end) for start, end in spans if text[start:end].strip()]
+
+def chunk_token_ids(text, tokenizer, budget=512, overlap=50):
+    """
+    Split text into chunks of at most `budget` tokens, working on token ids: all sentences are
+    tokenized in one batch and packed whole into chunks, so chunk borders fall on sentence
+    boundaries. A sentence longer than a chunk is cut into token windows.
+    Consecutive chunks share their last/first whole sentences, up to `overlap` tokens.
+    Returns: list of (chunk_text, chunk_ids) - ids without special tokens
+    """
+    spans = sentence_spans(text)
+    if not spans:
+        return []
+    sentence_ids = tokenizer([text[start:end] for start, end in spans], add_special_tokens=False)["input_ids"]
+
+    pieces = []
+    for (start, end), ids in zip(spans, sentence_ids):
+        if len(ids) <= budget:
+            pieces.append((text[start:end], ids))
+            continue
+        for i in range(0, len(ids), budget - overlap):
+            window = ids[i:i + budget]
+            pieces.append((tokenizer.decode(window), window))
+            if i + budget >= len(ids):
+                break
+
+    chunks = []
+    first = 0
+    while first < len(pieces):
+        last = first
+        length = 0
+        while last < len(pieces) and length + len(pieces[last][1]) <= budget:
+            length += len(pieces[last][1])
+            last += 1
+        chunks.append((
+            " ".join(piece_text for piece_text, _ in pieces[first:last]),
+            [token for _, ids in pieces[first:last] for token in ids],
+        ))
+        if last >= len(pieces):
+            break
+        # The next chunk starts with the last sentences of this one, up to `overlap` tokens
+        next_first = last
+        carried = 0
+        while next_first - 1 > first and carried + len(pieces[next_first - 1][1]) <= overlap:
+            carried += len(pieces[next_first - 1][1])
+            next_first -= 1
+        first = next_first
+    return chunks
+
+@functools.lru_cache(maxsize=8)
+def _prompt_affix_ids(tokenizer):
+    prefix, focus = tokenizer([PROMPT_PREFIX, PROMPT_FOCUS], add_special_tokens=False)["input_ids"]
+    return prefix, focus
+
+def prompt_chunk_budget(tokenizer, max_length=512, keyword_budget=KEYWORD_TOKEN_BUDGET):
+    """
+    Tokens left for the chunk itself once the prompt prefix, the "Focus on:" suffix,
+    the keyword budget and EOS are reserved.
+    """
+    prefix, focus = _prompt_affix_ids(tokenizer)
+    return max_length - len(prefix) - len(focus) - keyword_budget - 1
+
+def build_prompt_ids(chunk_ids, keywords_list, tokenizer, max_length=512):
+    """
+    Build the prompt input_ids of chunks directly from their token ids, same layout as build_prompt.
+    Keywords that do not fit in max_length are dropped from the end of the list, never the chunk.
+    chunk_ids: list of chunk id lists, keywords_list: list of keyword lists (one per chunk)
+    Returns: (ids_list, keywords_list) - the keywords actually in each prompt
+    """
+    prefix, focus = _prompt_affix_ids(tokenizer)
+    keyword_ids = tokenizer([", ".join(keywords) for keywords in keywords_list], add_special_tokens=False)["input_ids"]
+
+    results = []
+    used_keywords = []
+    for ids, keywords, kw_ids in zip(chunk_ids, keywords_list, keyword_ids):
+        available = max_length - len(prefix) - len(ids) - len(focus) - 1
+        keywords = list(keywords)
+        while len(kw_ids) > available and keywords:
+            keywords.pop()
+            kw_ids = tokenizer(", ".join(keywords), add_special_tokens=False)["input_ids"]
+        results.append(prefix + list(ids) + focus + kw_ids + [tokenizer.eos_token_id])
+        used_keywords.append(keywords)
+    return results, used_keywords
+
 def split_into_chunks(text, chunk_size=512, overlap=50):
     """
     Split text into overlapping chunks for the model input (by token length).
     Returns: list of chunks (strings)
     """
-    tokens = tokenizer.encode(text, truncation=False)
-    chunks = []
-    for i in range(0, len(tokens), chunk_size - overlap):
-        chunk = tokens[i:i + chunk_size]
-        chunks.append(tokenizer.decode(chunk))
-    return chunks
+    tokenizer = registry.get("chunk_tokenizer")
+    return [chunk_text for chunk_text, _ in chunk_token_ids(text, tokenizer, chunk_size, overlap)]
+
+def bucket_by_length(lengths, batch_size):
+    """
+    Group item indices into batches of similar length, so each batch pads to a close maximum.
+    lengths: list of sequence lengths
+    Returns: list of batches (lists of indices), shortest items first
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+@functools.lru_cache(maxsize=8)
+def _normalized_vocab(tokenizer):
+    """
+    Map every normalized token (lowercased, without the SentencePiece '▁') to the vocab ids sharing it.
+    Built once per tokenizer.
+    """
+    table = {}
+    tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+    for token_id, tok in enumerate(tokens):
+        table.setdefault(tok.lower().replace('▁', '').strip(), []).append(token_id)
+    return table
 
-def build_importance_mask(input_ids, keywords, tokenizer):
+@functools.lru_cache(maxsize=4096)
+def _keyword_token_ids(tokenizer, keywords):
+    """
+    Token ids of a keyword list (tuple of strings), computed once per list.
+    Returns: (ids, spans)
+      ids: vocab ids whose normalized token is a keyword word
+      spans: token id sequences of keyword words that the tokenizer splits into several sub-words
+    """
+    words = sorted(set(word.lower() for phrase in keywords for word in phrase.split()))
+    vocab = _normalized_vocab(tokenizer)
+    ids = sorted(set(token_id for word in words for token_id in vocab.get(word, ())))
+
+    # Keywords are lowercased, the text is not: also look for the capitalized and upper-case forms
+    variants = list(dict.fromkeys(form for word in words for form in (word, word.capitalize(), word.upper())))
+    spans = set()
+    if variants:
+        for sequence in tokenizer(variants, add_special_tokens=False)["input_ids"]:
+            if len(sequence) > 1:
+                spans.add(tuple(sequence))
+    return tuple(ids), tuple(sorted(spans))
+
+def build_importance_mask(input_ids, keywords, tokenizer, value=2.6):
     """
     Build importance mask for specific input_ids (after tokenization, padding, truncation).
-    5.0 for any token matching a keyword (phrase split to words), else 0.0.
-    input_ids: torch.Tensor of shape [batch, seq]
-    keywords: list of strings
+    `value` for any token matching a keyword (phrase split to words), else 0.0.
+    A keyword word split into several sub-word tokens is marked on its whole token span.
+    Padding tokens never match, so a padded batch can be passed as is.
+    input_ids: torch.Tensor of shape [batch, seq] (the mask is built on its device)
+    keywords: list of strings shared by all rows, or one list of strings per row
     tokenizer: the tokenizer used
     Returns: torch.Tensor [batch, seq]
     """
-    flat_keywords = set(word.lower() for phrase in keywords for word in phrase.split())
-    masks = []
-    for sequence in input_ids:
-        tokens = tokenizer.convert_ids_to_tokens(sequence)
-        mask = []
-        for tok in tokens:
-            tok_clean = tok.lower().replace('▁', '').strip()
-            is_important = tok_clean in flat_keywords
-            mask.append(2.6 if is_important else 0.0)
-        masks.append(mask)
-    return torch.tensor(masks, dtype=torch.float32)
+    batch_size = input_ids.size(0)
+    device = input_ids.device
+    if keywords and not isinstance(keywords[0], str):
+        per_row = [_keyword_token_ids(tokenizer, tuple(row_keywords)) for row_keywords in keywords]
+    else:
+        per_row = [_keyword_token_ids(tokenizer, tuple(keywords))] * batch_size
+
+    # Whole-token matches
+    important = torch.zeros(input_ids.shape, dtype=torch.bool, device=device)
+    width = max(len(ids) for ids, _ in per_row) if per_row else 0
+    if width:
+        if all(row is per_row[0] for row in per_row):
+            important = torch.isin(input_ids, torch.tensor(per_row[0][0], dtype=input_ids.dtype, device=device))
+        else:
+            table = torch.full((batch_size, width), -1, dtype=input_ids.dtype)
+            for row, (ids, _) in enumerate(per_row):
+                table[row, :len(ids)] = torch.tensor(ids, dtype=input_ids.dtype)
+            important = (input_ids.unsqueeze(-1) == table.to(device).unsqueeze(1)).any(-1)
+
+    # Multi-token spans: slide each pattern over the rows whose keywords contain it
+    patterns = {}
+    for row, (_, spans) in enumerate(per_row):
+        for span in spans:
+            patterns.setdefault(span, []).append(row)
+    for span, rows in patterns.items():
+        length = len(span)
+        if length > input_ids.size(1):
+            continue
+        pattern = torch.tensor(span, dtype=input_ids.dtype, device=device)
+        starts = (input_ids.unfold(1, length, 1) == pattern).all(-1)
+        if len(rows) < batch_size:
+            row_mask = torch.zeros(batch_size, 1, dtype=torch.bool, device=device)
+            row_mask[rows] = True
+            starts &= row_mask
+        for offset in range(length):
+            important[:, offset:offset + starts.size(1)] |= starts
+
+    return important.to(torch.float32) * value
 
 
 def build_prompt(section_text, keywords):
@@ -21,6 +21,7 @@ describe('ArticleInputComponent', () => {
       setKeywords: jasmine.createSpy(),
       setTrace: jasmine.createSpy(),
       setBaselineText: jasmine.createSpy(),
+      setBaselineId: jasmine.createSpy(),
       clear: jasmine.createSpy()
     };
 
@@ -130,6 +131,7 @@ describe('ArticleInputComponent', () => {
     expect(mockSimplifyService.setSimplifiedText).toHaveBeenCalledWith('Success message');    
     expect(mockSimplifyService.setKeywords).toHaveBeenCalledWith(dummyResponse.keywords);
     expect(mockSimplifyService.setBaselineText).toHaveBeenCalledWith(dummyResponse.baseline);
+    expect(mockSimplifyService.setBaselineId).toHaveBeenCalledWith(null);
     expect(mockSimplifyService.setTrace).toHaveBeenCalledWith(dummyResponse.trace);
     expect(mockSimplifyService.setMetrics).toHaveBeenCalledWith(dummyResponse.metrics);
   }));
@@ -2,8 +2,9 @@ import { Component, ViewChild, ElementRef } from '@angular/core';
 import { SimplifyService } from '../../services/simplify.service';
 import { SettingsService } from '../../services/settings.service';
 import { HttpClient } from '@angular/common/http';
+import { filter, switchMap, take } from 'rxjs/operators';
 
-import { ApiService, Metrics } from '../../services/api.service';
+import { ApiService, Metrics, SimplifyResponse } from '../../services/api.service';
 import Chart from 'chart.js/auto';
 import * as pdfjsLib from 'pdfjs-dist';
 (pdfjsLib as any).GlobalWorkerOptions.workerSrc = `//cdnjs.cloudflare.com/ajax/libs/pdf.js/${pdfjsLib.version}/pdf.worker.min.js`;
@@ -21,7 +22,11 @@ export class ArticleInputComponent {
   text: string = '';
   isFileUploaded: boolean = false;
   simplifySubscription: any;
+  metricsSubscription: any;
   extractSub: any;
+  // GROBID TEI of the uploaded PDF, and the text parsed from it
+  teiXml: string | null = null;
+  teiText: string = '';
 
   constructor(
     private simplifyService: SimplifyService,
@@ -51,6 +56,8 @@ export class ArticleInputComponent {
   extractPdf(file: File) {
     this.extractSub = this.apiService.extractPdf(file).subscribe(xml => {
       this.text = this.parseTeiXml(xml);  
+      this.teiXml = xml;
+      this.teiText = this.text;
     }, err => {
       console.error('Error calling GROBID via backend:', err);
       this.text = "Error extracting PDF.";
@@ -123,14 +130,20 @@ export class ArticleInputComponent {
     this.simplifyService.setTrace(null);
     this.simplifyService.setMetrics(null);
   
-    this.simplifySubscription = this.apiService.simplifyText(inputText).subscribe({
+    // Send the TEI only while the extracted text is unedited, so both describe the same article
+    const tei = this.teiXml && this.text === this.teiText ? this.teiXml : undefined;
+    this.simplifySubscription = this.apiService.simplifyText(inputText, tei).subscribe({
       next: (res) => {
         this.simplifyService.setSimplifiedText(res.simplified);
         this.simplifyService.setKeywords(res.keywords);
-        this.simplifyService.setBaselineText(res.baseline);
+        // Without a baseline yet, the compare view fetches it through res.baselineId
+        this.simplifyService.setBaselineText(res.baseline ?? '');
+        this.simplifyService.setBaselineId(res.baseline ? null : res.baselineId ?? null);
         this.simplifyService.setTrace(res.trace);
         this.simplifyService.setMetrics(res.metrics);
-
+        if (this.settingsService.getCurrentMode() === 'advanced') {
+          this.loadComparisonMetrics(res);
+        }
       },
       error: (err) => {
         console.error('שגיאה מהשרת:', err);
@@ -139,11 +152,32 @@ export class ArticleInputComponent {
     });
   }
 
+  // BERTScore and SBERT similarity are slow, so they are fetched separately and only in advanced mode,
+  // once the baseline they compare against is available.
+  loadComparisonMetrics(res: SimplifyResponse) {
+    this.metricsSubscription = this.simplifyService.baselineText$.pipe(
+      filter(baseline => !!baseline),
+      take(1),
+      switchMap(baseline => this.apiService.computeMetrics(res.simplified, baseline, ['bert', 'berts']))
+    ).subscribe({
+      next: (extra) => {
+        this.simplifyService.setMetrics({ ...res.metrics, ...extra.metrics });
+      },
+      error: (err) => {
+        console.error('Error computing comparison metrics:', err);
+      }
+    });
+  }
+
   onClear() {
   if (this.simplifySubscription) {
     this.simplifySubscription.unsubscribe();
     this.simplifySubscription = null;
   }
+  if (this.metricsSubscription) {
+    this.metricsSubscription.unsubscribe();
+    this.metricsSubscription = null;
+  }
   if (this.extractSub){
     this.extractSub.unsubscribe();
     this.extractSub = null;
@@ -151,6 +185,8 @@ export class ArticleInputComponent {
 
 
   this.text = '';
+  this.teiXml = null;
+  this.teiText = '';
   this.isFileUploaded = false;
   this.simplifyService.setMetrics(null);
   this.simplifyService.clear();
@@ -3,6 +3,7 @@
 import { ComponentFixture, TestBed } from '@angular/core/testing';
 import { CompareModelOutputComponent } from './compare-model-output.component';
 import { SimplifyService } from '../../services/simplify.service';
+import { ApiService } from '../../services/api.service';
 import { of } from 'rxjs';
 
 describe('CompareModelOutputComponent', () => {
@@ -10,13 +11,21 @@ describe('CompareModelOutputComponent', () => {
   let fixture: ComponentFixture<CompareModelOutputComponent>;
 
   const mockSimplifyService = {
-    baselineText$: of('This is the baseline output of the model.')
+    baselineText$: of('This is the baseline output of the model.'),
+    baselineId$: of(null),
+    setBaselineText: jasmine.createSpy('setBaselineText')
+  };
+  const mockApiService = {
+    waitForBaseline: jasmine.createSpy('waitForBaseline').and.returnValue(of('Fetched baseline.'))
   };
 
   beforeEach(async () => {
     await TestBed.configureTestingModule({
       declarations: [CompareModelOutputComponent],
-      providers: [{ provide: SimplifyService, useValue: mockSimplifyService }]
+      providers: [
+        { provide: SimplifyService, useValue: mockSimplifyService },
+        { provide: ApiService, useValue: mockApiService }
+      ]
     }).compileComponents();
 
     fixture = TestBed.createComponent(CompareModelOutputComponent);
@@ -38,6 +47,13 @@ describe('CompareModelOutputComponent', () => {
     expect(wordCount.textContent).toContain('8 words');
   });
 
+  it('should fetch a baseline still being generated', () => {
+    component.fetchBaseline('abc');
+    expect(mockApiService.waitForBaseline).toHaveBeenCalledWith('abc');
+    expect(mockSimplifyService.setBaselineText).toHaveBeenCalledWith('Fetched baseline.');
+    expect(component.baselinePending).toBeFalse();
+  });
+
   it('should not display card if baselineText is empty', () => {
     component.baselineText = '';
     fixture.detectChanges();
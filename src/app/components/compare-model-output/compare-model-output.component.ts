@@ -1,5 +1,7 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
+import { Subscription } from 'rxjs';
 import { SimplifyService } from '../../services/simplify.service';
+import { ApiService } from '../../services/api.service';
 
 @Component({
   selector: 'app-compare-model-output',
@@ -7,14 +9,46 @@ import { SimplifyService } from '../../services/simplify.service';
   templateUrl: './compare-model-output.component.html',
   styleUrl: './compare-model-output.component.css'
 })
-export class CompareModelOutputComponent implements OnInit {
+export class CompareModelOutputComponent implements OnInit, OnDestroy {
   baselineText: string = '';
+  baselinePending: boolean = false;
+  private subscriptions = new Subscription();
+  private baselineSubscription: Subscription | null = null;
 
-  constructor(private simplifyService: SimplifyService) {}
+  constructor(private simplifyService: SimplifyService, private apiService: ApiService) {}
 
   ngOnInit(): void {
-    this.simplifyService.baselineText$.subscribe(text => {
+    this.subscriptions.add(this.simplifyService.baselineText$.subscribe(text => {
       this.baselineText = text;
+    }));
+    // The baseline is generated in the background after /simplify answers, fetch it once it is done
+    this.subscriptions.add(this.simplifyService.baselineId$.subscribe(id => this.fetchBaseline(id)));
+  }
+
+  fetchBaseline(id: string | null) {
+    if (this.baselineSubscription) {
+      this.baselineSubscription.unsubscribe();
+      this.baselineSubscription = null;
+    }
+    this.baselinePending = !!id;
+    if (!id) return;
+
+    this.baselineSubscription = this.apiService.waitForBaseline(id).subscribe({
+      next: (text) => {
+        this.baselinePending = false;
+        this.simplifyService.setBaselineText(text);
+      },
+      error: (err) => {
+        this.baselinePending = false;
+        console.error('Error fetching the baseline output:', err);
+      }
     });
   }
+
+  ngOnDestroy(): void {
+    this.subscriptions.unsubscribe();
+    if (this.baselineSubscription) {
+      this.baselineSubscription.unsubscribe();
+    }
+  }
 }
@@ -1,4 +1,4 @@
-import { TestBed } from '@angular/core/testing';
+import { TestBed, fakeAsync, tick } from '@angular/core/testing';
 import { HttpClientTestingModule, HttpTestingController } from '@angular/common/http/testing';
 import { ApiService, SimplifyResponse } from './api.service';
 
@@ -51,4 +51,40 @@ describe('ApiService', () => {
 
     req.flush(mockResponse); 
   });
+
+  it('should include the TEI in the simplify request when given', () => {
+    service.simplifyText('text', '<TEI/>').subscribe();
+
+    const req = httpMock.expectOne('http://localhost:5001/simplify');
+    expect(req.request.body).toEqual({ text: 'text', tei: '<TEI/>' });
+
+    req.flush({});
+  });
+
+  it('should poll the baseline endpoint until the baseline is done', fakeAsync(() => {
+    let baseline: string | undefined;
+    service.waitForBaseline('abc', 1000).subscribe(text => baseline = text);
+
+    tick(0);
+    httpMock.expectOne('http://localhost:5001/baseline/abc').flush({ status: 'pending' });
+    expect(baseline).toBeUndefined();
+
+    tick(1000);
+    httpMock.expectOne('http://localhost:5001/baseline/abc').flush({ status: 'done', baseline: 'baseline text' });
+    expect(baseline).toBe('baseline text');
+  }));
+
+  it('should send POST request to metrics endpoint with the requested metrics', () => {
+    const mockResponse = { metrics: { readability: 90, complexity: 5, frequencyScore: 2, bert: 80 } };
+
+    service.computeMetrics('output', 'baseline', ['bert']).subscribe(res => {
+      expect(res).toEqual(mockResponse);
+    });
+
+    const req = httpMock.expectOne('http://localhost:5001/metrics');
+    expect(req.request.method).toBe('POST');
+    expect(req.request.body).toEqual({ output: 'output', baseline: 'baseline', metrics: ['bert'] });
+
+    req.flush(mockResponse);
+  });
 });
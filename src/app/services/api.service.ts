@@ -1,24 +1,33 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, timer } from 'rxjs';
+import { first, map, switchMap } from 'rxjs/operators';
 
 export interface Metrics {
   readability: number;
   complexity: number;
   frequencyScore: number;
-  bert: number;
-  berts: number
+  bert?: number;
+  berts?: number
 }
 
 export interface SimplifyResponse {
   original: string;
   simplified: string;
   keywords: { [section: string]: string[] };
-  baseline: string; 
+  // null while the baseline is still being generated in the background, see waitForBaseline
+  baseline: string | null;
+  baselineId?: string | null;
   trace: any;
   metrics: Metrics;
 }
 
+export interface BaselineResponse {
+  status: 'pending' | 'done' | 'error';
+  baseline?: string;
+  error?: string;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -27,8 +36,27 @@ export class ApiService {
 
   constructor(private http: HttpClient) {}
 
-  simplifyText(text: string): Observable<SimplifyResponse> {
-    return this.http.post<SimplifyResponse>(`${this.baseUrl}/simplify`, { text });
+  // tei: the /extract-pdf XML the text was taken from, so the backend can use its sections
+  simplifyText(text: string, tei?: string): Observable<SimplifyResponse> {
+    const body = tei ? { text, tei } : { text };
+    return this.http.post<SimplifyResponse>(`${this.baseUrl}/simplify`, body);
+  }
+
+  getBaseline(id: string): Observable<BaselineResponse> {
+    return this.http.get<BaselineResponse>(`${this.baseUrl}/baseline/${id}`);
+  }
+
+  // Poll /baseline/<id> until the background baseline is done, then emit its text once
+  waitForBaseline(id: string, intervalMs: number = 2000): Observable<string> {
+    return timer(0, intervalMs).pipe(
+      switchMap(() => this.getBaseline(id)),
+      first(res => res.status === 'done'),
+      map(res => res.baseline ?? '')
+    );
+  }
+
+  computeMetrics(output: string, baseline: string, metrics: string[]): Observable<{ metrics: Metrics }> {
+    return this.http.post<{ metrics: Metrics }>(`${this.baseUrl}/metrics`, { output, baseline, metrics });
   }
 
   extractPdf(file: File): Observable<string> {
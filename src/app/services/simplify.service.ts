@@ -19,6 +19,10 @@ export class SimplifyService {
   private baselineTextSource = new BehaviorSubject<string>('');
   baselineText$ = this.baselineTextSource.asObservable();
 
+  // Id of a baseline still being generated by the backend
+  private baselineIdSource = new BehaviorSubject<string | null>(null);
+  baselineId$ = this.baselineIdSource.asObservable();
+
   private traceSource = new BehaviorSubject<any>(null);
   trace$ = this.traceSource.asObservable();
 
@@ -45,11 +49,16 @@ export class SimplifyService {
   this.baselineTextSource.next(text);
   } 
 
+  setBaselineId(id: string | null) {
+    this.baselineIdSource.next(id);
+  }
+
   clear() {
     this.simplifiedTextSource.next('');
     this.simplifiedActiveSource.next(false);
     this.keywordsSource.next({});
     this.baselineTextSource.next('');
+    this.baselineIdSource.next(null);
     this.traceSource.next(null);
     this.metricsSource.next(null);
 